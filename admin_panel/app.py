@@ -1,9 +1,22 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file
+from flask import (
+    Flask, Response, render_template, request, redirect, url_for, session, stream_with_context
+)
+from markupsafe import Markup, escape
 import sqlite3
 import os
+import sys
 from functools import wraps
-from openpyxl import Workbook
-from datetime import datetime
+from datetime import datetime, timedelta
+from exporter import FORMATS, TABLES, export_stream, remove_file, stream_file, xlsx_file
+from pagination import KeysetPage, date_bounds, decode_cursor, keyset_query, page_size
+from search import (
+    HIGHLIGHT_END, HIGHLIGHT_START, KINDS, SEARCH_WINDOW, match_expression, search_query, window_truncates
+)
+
+# The rollup and search schemas live with the chatbot's database code
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from database.fulltext import install_fulltext_sqlite  # noqa: E402
+from database.rollups import install_rollups_sqlite  # noqa: E402
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this to a secure secret key
@@ -11,14 +24,30 @@ app.secret_key = 'your-secret-key-here'  # Change this to a secure secret key
 # Update database path to use the existing database
 DATABASE_PATH = '../database.db'
 
+# Days of history in the dashboard charts
+DASHBOARD_DAYS = 30
+
 # Ensure database and tables exist
 def init_db():
     if not os.path.exists(DATABASE_PATH):
         from init_db import init_db as create_db
         create_db()
 
+def install_schema():
+    """Add the dashboard rollups and search indexes to a database created before them"""
+    conn = sqlite3.connect(DATABASE_PATH)
+    # Each feature reports its own failure; the other pages still work
+    for name, install in (('dashboard rollups', install_rollups_sqlite),
+                          ('search indexes', install_fulltext_sqlite)):
+        try:
+            install(conn)
+        except sqlite3.Error as e:
+            print(f"Could not install the {name}: {e}")
+    conn.close()
+
 # Initialize database on startup
 init_db()
+install_schema()
 
 def admin_required(f):
     @wraps(f)
@@ -37,6 +66,55 @@ def get_db_connection():
         print(f"Database error: {e}")
         return None
 
+def open_page(sql, params, limit, key, conn=None):
+    """Run a page's query up front, so a database error is a 500 before streaming starts.
+
+    Returns None on failure, having closed the connection.
+    """
+    conn = conn or get_db_connection()
+    if not conn:
+        return None
+    try:
+        return KeysetPage(conn, sql, params, limit, key)
+    except sqlite3.Error as e:
+        conn.close()
+        print(f"Database error: {e}")
+        return None
+
+def stream_page(template_name, **context):
+    """Render a template as a stream of chunks instead of building one string"""
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(32)
+    response = Response(stream_with_context(stream))
+    # Pages close their connection when iterated; this covers templates that fail first
+    for value in context.values():
+        if isinstance(value, KeysetPage):
+            response.call_on_close(value.close)
+    return response
+
+def page_filters():
+    """Date range and session filters shared by the paginated views"""
+    return {name: request.args.get(name, '').strip() for name in ('start', 'end', 'session')}
+
+def date_conditions(column, filters):
+    """SQL conditions and parameters for the start/end date filters"""
+    lower, upper = date_bounds(filters['start'], filters['end'])
+    conditions, params = [], []
+    if lower:
+        conditions.append(f'{column} >= ?')
+        params.append(lower)
+    if upper:
+        conditions.append(f'{column} < ?')
+        params.append(upper)
+    return conditions, params
+
+@app.template_filter('highlight')
+def highlight(snippet):
+    """Escape a search snippet, then mark up the matched terms"""
+    text = str(escape(snippet or ''))
+    return Markup(text.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
 @app.route('/')
 def index():
     return redirect(url_for('login'))
@@ -61,24 +139,28 @@ def dashboard():
             
         cursor = conn.cursor()
         
-        # Get total counts
-        cursor.execute('SELECT COUNT(*) FROM chat_messages')
-        total_messages = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(DISTINCT session_id) FROM chat_messages')
-        total_sessions = cursor.fetchone()[0]
+        # Totals and per-day counts are kept current by triggers (src/database/rollups.py)
+        cursor.execute('SELECT messages, sessions, contacts FROM stats_totals WHERE id = 1')
+        total_messages, total_sessions, total_contacts = cursor.fetchone() or (0, 0, 0)
         
-        cursor.execute('SELECT COUNT(*) FROM contact_forms')
-        total_contacts = cursor.fetchone()[0]
+        first_day = datetime.utcnow().date() - timedelta(days=DASHBOARD_DAYS - 1)
+        cursor.execute(
+            'SELECT day, messages, sessions, leads FROM stats_daily WHERE day >= ? ORDER BY day',
+            (first_day.isoformat(),)
+        )
+        counts = {row['day']: row for row in cursor.fetchall()}
+        daily = {'days': [], 'messages': [], 'sessions': [], 'leads': []}
+        for offset in range(DASHBOARD_DAYS):
+            day = (first_day + timedelta(days=offset)).isoformat()
+            row = counts.get(day)
+            daily['days'].append(day)
+            for name in ('messages', 'sessions', 'leads'):
+                daily[name].append(row[name] if row else 0)
         
         # Get recent sessions
         cursor.execute('''
-            SELECT 
-                cm.session_id,
-                cm.content as last_message,
-                MAX(cm.timestamp) as last_time
-            FROM chat_messages cm
-            GROUP BY cm.session_id
+            SELECT session_id, last_message, last_time
+            FROM session_activity
             ORDER BY last_time DESC
             LIMIT 5
         ''')
@@ -89,7 +171,8 @@ def dashboard():
                              total_messages=total_messages,
                              total_sessions=total_sessions,
                              total_contacts=total_contacts,
-                             recent_sessions=recent_sessions)
+                             recent_sessions=recent_sessions,
+                             daily=daily)
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return "Database error", 500
@@ -97,44 +180,57 @@ def dashboard():
 @app.route('/chats')
 @admin_required
 def view_chats():
+    filters = page_filters()
+    limit = page_size(request.args.get('limit'))
     try:
-        conn = get_db_connection()
-        if not conn:
-            return "Database error", 500
-            
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, session_id, sender, content, timestamp 
-            FROM chat_messages 
-            ORDER BY timestamp DESC
-        ''')
-        chats = cursor.fetchall()
-        conn.close()
-        return render_template('chats.html', chats=chats)
-    except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        after = decode_cursor(request.args.get('cursor'))
+        conditions, params = date_conditions('timestamp', filters)
+    except ValueError as e:
+        return f"Bad request: {e}", 400
+    if filters['session']:
+        conditions.insert(0, 'session_id = ?')
+        params.insert(0, filters['session'])
+
+    sql, params = keyset_query(
+        'SELECT id, session_id, sender, content, timestamp FROM chat_messages',
+        ('timestamp', 'id'), conditions, params, after
+    )
+    chats = open_page(sql, params, limit, key=lambda row: (row['timestamp'], row['id']))
+    if chats is None:
         return "Database error", 500
+    return stream_page('chats.html', chats=chats, filters=filters, limit=limit)
 
 @app.route('/sessions')
 @admin_required
 def view_sessions():
+    filters = page_filters()
+    limit = page_size(request.args.get('limit'))
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT session_id, 
-                   COUNT(*) as message_count, 
-                   MIN(timestamp) as start_time,
-                   MAX(timestamp) as end_time
-            FROM chat_messages 
-            GROUP BY session_id 
-            ORDER BY start_time DESC
-        ''')
-        sessions = cursor.fetchall()
-        conn.close()
-        return render_template('sessions.html', sessions=sessions)
-    except sqlite3.Error as e:
+        after = decode_cursor(request.args.get('cursor'))
+        conditions, params = date_conditions('s.start_time', filters)
+    except ValueError as e:
+        return f"Bad request: {e}", 400
+    if filters['session']:
+        # Prefix match on the primary key, as a range so the index is used
+        conditions.insert(0, 's.session_id >= ? AND s.session_id < ?')
+        params[:0] = [filters['session'], filters['session'] + '\uffff']
+
+    page_sql, params = keyset_query(
+        'SELECT s.session_id, s.start_time FROM chat_sessions s',
+        ('s.start_time', 's.session_id'), conditions, params, after
+    )
+    # Pick the page first so message counts are only computed for its sessions
+    sql = f'''
+        SELECT p.session_id,
+               p.start_time,
+               (SELECT COUNT(*) FROM chat_messages m WHERE m.session_id = p.session_id) AS message_count,
+               (SELECT MAX(m.timestamp) FROM chat_messages m WHERE m.session_id = p.session_id) AS end_time
+        FROM ({page_sql}) p
+        ORDER BY p.start_time DESC, p.session_id DESC'''
+    sessions = open_page(sql, params, limit, key=lambda row: (row['start_time'], row['session_id']))
+    if sessions is None:
         return "Database error", 500
+    return stream_page('sessions.html', sessions=sessions, filters=filters, limit=limit)
 
 @app.route('/session/<session_id>')
 @admin_required
@@ -171,51 +267,94 @@ def view_contacts():
 @app.route('/export')
 @admin_required
 def export_data():
+    """Stream chat messages and contact forms as xlsx, csv or ndjson.
+
+    Query parameters: format (xlsx, csv or ndjson), table (messages or
+    contacts; xlsx also takes all, the default), since_id for incremental
+    exports of a single table, and start/end dates.
+    """
+    fmt = request.args.get('format', 'xlsx')
+    table = request.args.get('table', 'all' if fmt == 'xlsx' else 'messages')
+    if fmt not in FORMATS:
+        return f"Bad request: unknown format {fmt}", 400
+    if table not in TABLES and not (fmt == 'xlsx' and table == 'all'):
+        return f"Bad request: unknown table {table}", 400
     try:
-        conn = get_db_connection()
-        if not conn:
-            return "Database error", 500
-            
-        # Create a new workbook
-        wb = Workbook()
-        
-        # Create Chats sheet
-        ws_chats = wb.active
-        ws_chats.title = "Chat Messages"
-        ws_chats.append(['Session ID', 'Sender', 'Message', 'Timestamp'])
-        
-        cursor = conn.cursor()
-        cursor.execute('SELECT session_id, sender, content, timestamp FROM chat_messages ORDER BY timestamp')
-        chat_rows = cursor.fetchall()
-        for row in chat_rows:
-            # Convert Row object to list
-            ws_chats.append([row['session_id'], row['sender'], row['content'], row['timestamp']])
-            
-        # Create Contacts sheet
-        ws_contacts = wb.create_sheet("Contact Forms")
-        ws_contacts.append(['Name', 'Email', 'Phone', 'Message', 'Submission Date'])
-        
-        cursor.execute('SELECT name, email, phone, message, submission_date FROM contact_forms ORDER BY submission_date')
-        contact_rows = cursor.fetchall()
-        for row in contact_rows:
-            # Convert Row object to list
-            ws_contacts.append([row['name'], row['email'], row['phone'], row['message'], row['submission_date']])
-            
+        since_id = int(request.args.get('since_id') or 0)
+        start, end = date_bounds(request.args.get('start', ''), request.args.get('end', ''))
+    except ValueError as e:
+        return f"Bad request: {e}", 400
+    if since_id and table == 'all':
+        # Messages and contact forms number their ids independently
+        return "Bad request: since_id needs a single table", 400
+
+    mimetype, extension = FORMATS[fmt]
+    filename = f'bito_{table}_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    # Open the connection before any headers go out, so a failure is still a 500
+    conn = get_db_connection()
+    if not conn:
+        return "Database error", 500
+    if fmt == 'xlsx':
+        # The workbook has to be complete before it can be sent, so build it first
+        try:
+            path = xlsx_file(conn, table, since_id=since_id, start=start, end=end)
+        except (RuntimeError, sqlite3.Error) as e:
+            print(f"Export failed: {e}")
+            return "Export failed", 500
+        finally:
+            conn.close()
+        response = Response(stream_file(path), mimetype=mimetype, headers=headers)
+        # Covers clients that disconnect before the file starts sending
+        response.call_on_close(lambda: remove_file(path))
+        return response
+    chunks = export_stream(conn, fmt, table, since_id=since_id, start=start, end=end)
+    response = Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+    # Covers clients that disconnect before the generator starts
+    response.call_on_close(conn.close)
+    return response
+
+@app.route('/search')
+@admin_required
+def search():
+    """Full-text search over chat messages or contact forms, best matches first.
+
+    Only the newest SEARCH_WINDOW matches are ranked unless all=1 is passed.
+    """
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind', 'messages')
+    limit = page_size(request.args.get('limit'))
+    search_all = request.args.get('all') == '1'
+    window = None if search_all else SEARCH_WINDOW
+    if kind not in KINDS:
+        return f"Bad request: unknown kind {kind}", 400
+    try:
+        after = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return f"Bad request: {e}", 400
+
+    expression = match_expression(query)
+    if not expression:
+        return render_template('search.html', hits=None, query=query, kind=kind, limit=limit,
+                               search_all=search_all)
+    sql, params = search_query(kind, expression, after, window)
+    conn = get_db_connection()
+    if not conn:
+        return "Database error", 500
+    try:
+        truncated = window_truncates(conn, kind, expression, window)
+    except sqlite3.Error as e:
         conn.close()
-        
-        # Save the file
-        filename = f'bito_data_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        filepath = os.path.join(os.path.dirname(__file__), 'exports', filename)
-        
-        # Create exports directory if it doesn't exist
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        wb.save(filepath)
-        return send_file(filepath, as_attachment=True)
-        
-    except Exception as e:
-        print(f"Export error: {e}")
-        return "Export failed", 500
+        print(f"Database error: {e}")
+        if 'no such table' in str(e):
+            return ("Search index not installed. Restart the admin panel, or run "
+                    "'python -m database.fulltext ../database.db' from src/", 503)
+        return "Database error", 500
+    hits = open_page(sql, params, limit, key=lambda row: (row['score'], row['id']), conn=conn)
+    if hits is None:
+        return "Database error", 500
+    return stream_page('search.html', hits=hits, query=query, kind=kind, limit=limit,
+                       search_all=search_all, truncated=truncated, window=window)
 
 if __name__ == '__main__':
     app.run(port=5001)  # Running on a different port than the main application
@@ -0,0 +1,164 @@
+"""Constant-memory exports of chat messages and contact forms.
+
+Rows are read from SQLite in batches with ``fetchmany`` and written out as
+they arrive, so memory use does not grow with the size of the history.
+CSV and NDJSON are streamed straight into the response. XLSX uses
+openpyxl's write-only mode, which spools rows to a temporary file. The file
+is finished before the response starts, so a failure is still an error
+status, and is then streamed back and deleted.
+
+Every export is ordered by id. ``since_id`` resumes after the last row of a
+previous export of the same table, and ``start``/``end`` limit it to a date range.
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # Only needed for the xlsx format
+    Workbook = None
+
+BATCH_SIZE = 1000
+FILE_CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+class ExportTable:
+    def __init__(self, table, columns, date_column, sheet_title):
+        self.table = table
+        self.columns = columns
+        self.date_column = date_column
+        self.sheet_title = sheet_title
+
+
+TABLES = {
+    'messages': ExportTable(
+        'chat_messages', ['id', 'session_id', 'sender', 'content', 'timestamp'],
+        'timestamp', 'Chat Messages'
+    ),
+    'contacts': ExportTable(
+        'contact_forms', ['id', 'name', 'email', 'phone', 'message', 'submission_date', 'status', 'session_id'],
+        'submission_date', 'Contact Forms'
+    ),
+}
+
+
+def iter_rows(conn, table, since_id=0, start=None, end=None, batch_size=BATCH_SIZE):
+    """Yield row tuples in id order, a batch at a time"""
+    conditions, params = ['id > ?'], [since_id]
+    if start:
+        conditions.append(f'{table.date_column} >= ?')
+        params.append(start)
+    if end:
+        conditions.append(f'{table.date_column} < ?')
+        params.append(end)
+    cursor = conn.execute(
+        f"SELECT {', '.join(table.columns)} FROM {table.table} "
+        f"WHERE {' AND '.join(conditions)} ORDER BY id",
+        params
+    )
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _batched_text(lines, batch_size=BATCH_SIZE):
+    """Join lines into one chunk per batch instead of one tiny write per row"""
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= batch_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_stream(conn, table, **filters):
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def line(row):
+        writer.writerow(row)
+        text = out.getvalue()
+        out.seek(0)
+        out.truncate()
+        return text
+
+    def lines():
+        yield line(table.columns)
+        for row in iter_rows(conn, table, **filters):
+            yield line(row)
+
+    return _batched_text(lines())
+
+
+def ndjson_stream(conn, table, **filters):
+    def lines():
+        for row in iter_rows(conn, table, **filters):
+            yield json.dumps(dict(zip(table.columns, row)), default=str) + '\n'
+
+    return _batched_text(lines())
+
+
+def xlsx_file(conn, table_name, **filters):
+    """Write the export to a temporary workbook, one sheet per table, and return its path"""
+    if Workbook is None:
+        raise RuntimeError("Install openpyxl to export xlsx")
+    tables = list(TABLES.values()) if table_name == 'all' else [TABLES[table_name]]
+    workbook = Workbook(write_only=True)
+    for table in tables:
+        sheet = workbook.create_sheet(table.sheet_title)
+        sheet.append(table.columns)
+        for row in iter_rows(conn, table, **filters):
+            sheet.append(list(row))
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def remove_file(path):
+    """Delete a finished export; safe to call again once it is gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def stream_file(path, chunk_size=FILE_CHUNK_SIZE):
+    """Yield a file's bytes and delete it once sent, or once the client goes away"""
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+    finally:
+        remove_file(path)
+
+
+def export_stream(conn, fmt, table_name, **filters):
+    """Chunks of a csv or ndjson export, read from an open connection that is closed at the end"""
+    try:
+        if fmt == 'csv':
+            yield from csv_stream(conn, TABLES[table_name], **filters)
+        else:
+            yield from ndjson_stream(conn, TABLES[table_name], **filters)
+    finally:
+        conn.close()
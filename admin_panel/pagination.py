@@ -0,0 +1,110 @@
+"""Keyset pagination for the admin panel's large tables.
+
+A page is fetched with ``ORDER BY key DESC LIMIT n + 1`` starting just
+after the last row of the previous page, so every page costs the same
+index range scan however deep it is, unlike OFFSET. The position is
+carried in an opaque cursor holding the last row's sort key.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """The sort key stored in a cursor, or None for the first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != 2:
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return values
+
+
+def page_size(value):
+    """Page size from a query argument, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def date_bounds(start, end):
+    """Inclusive YYYY-MM-DD dates as [start, end + 1 day) timestamp bounds; blanks are open"""
+    lower = upper = None
+    if start:
+        lower = datetime.strptime(start, '%Y-%m-%d').strftime('%Y-%m-%d')
+    if end:
+        upper = (datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    return lower, upper
+
+
+class KeysetPage:
+    """One page of rows, read lazily from an open cursor.
+
+    The query runs when the page is created, so a database error can still
+    become an error response before anything is streamed. Iterating then
+    yields at most ``limit`` rows straight from SQLite, so a streamed
+    template never holds the page in memory. Once iteration ends
+    ``next_cursor`` points after the last row shown, or is None on the last
+    page, and the connection is closed. Call ``close()`` if the page may
+    never be iterated.
+    """
+
+    def __init__(self, connection, sql, params, limit, key):
+        self.connection = connection
+        self.limit = limit
+        self.key = key
+        self.count = 0
+        self.next_cursor = None
+        # One extra row tells us whether there is a next page
+        self._rows = connection.execute(sql, list(params) + [limit + 1])
+
+    def __iter__(self):
+        try:
+            last = None
+            for row in self._rows:
+                if self.count == self.limit:
+                    self.next_cursor = encode_cursor(*self.key(last))
+                    break
+                self.count += 1
+                last = row
+                yield row
+        finally:
+            self.close()
+
+    def close(self):
+        self.connection.close()
+
+
+def keyset_query(select, key_columns, filters, params, after):
+    """Build a descending keyset query over a (sort column, unique column) pair.
+
+    ``after`` is the decoded cursor. The sort column bound is written as
+    ``sort <= ?`` plus a tie-break so SQLite can use it as an index range.
+    """
+    sort_column, unique_column = key_columns
+    clauses = list(filters)
+    params = list(params)
+    if after is not None:
+        clauses.append(f"{sort_column} <= ? AND ({sort_column} < ? OR {unique_column} < ?)")
+        params.extend([after[0], after[0], after[1]])
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    sql = f"{select}{where} ORDER BY {sort_column} DESC, {unique_column} DESC LIMIT ?"
+    return sql, params
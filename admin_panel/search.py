@@ -0,0 +1,88 @@
+"""Ranked full-text search over the FTS5 indexes in src/database/fulltext.py.
+
+Hits are ordered by bm25 (lower is better) and paged with a cursor holding
+the last hit's (score, rowid), like the other keyset-paginated views.
+Scoring has to visit every hit, so a word found in a fifth of a million
+messages would take half a second to rank. By default only the newest
+``SEARCH_WINDOW`` matches are ranked; FTS5 finds them by walking the rowid
+order, and the rarer terms staff usually search for stay well inside the
+window. ``window_truncates`` tells the page when older matches were left
+out, and passing ``window=None`` ranks every match.
+Snippets come back with the matched terms wrapped in ``HIGHLIGHT_START`` and
+``HIGHLIGHT_END`` control characters, so the template can HTML-escape the
+text first and only then turn the markers into ``<mark>`` tags.
+"""
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+SNIPPET_TOKENS = 16
+SEARCH_WINDOW = 10000
+
+KINDS = ('messages', 'contacts')
+
+
+def match_expression(query):
+    """An FTS5 MATCH expression requiring every word of a free-text query.
+
+    Each word is quoted so punctuation is taken literally: an email address
+    becomes a phrase of its parts instead of a syntax error. A trailing ``*``
+    keeps its meaning as a prefix search.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def _fts_table(kind):
+    return 'chat_messages_fts' if kind == 'messages' else 'contact_forms_fts'
+
+
+def window_truncates(conn, kind, expression, window=SEARCH_WINDOW):
+    """Whether more than ``window`` rows match, so the oldest are not ranked"""
+    if window is None:
+        return False
+    table = _fts_table(kind)
+    count = conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT rowid FROM {table} WHERE {table} MATCH ? LIMIT ?)",
+        (expression, window + 1)
+    ).fetchone()[0]
+    return count > window
+
+
+def _snippet(table, column):
+    return f"snippet({table}, {column}, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', {SNIPPET_TOKENS})"
+
+
+def search_query(kind, expression, after, window=SEARCH_WINDOW):
+    """SQL and parameters for one page of hits; the caller appends the LIMIT.
+
+    With a ``window`` only the newest that many matches are ranked; None ranks them all.
+    """
+    table = _fts_table(kind)
+    if kind == 'messages':
+        select = (
+            f"SELECT m.id, m.session_id, m.sender, m.timestamp, f.rank AS score, "
+            f"{_snippet('chat_messages_fts', 0)} AS snippet "
+            f"FROM chat_messages_fts f JOIN chat_messages m ON m.id = f.rowid"
+        )
+    else:
+        # -1 lets FTS5 pick whichever column matched best
+        select = (
+            f"SELECT c.id, c.name, c.email, c.phone, c.submission_date, c.status, f.rank AS score, "
+            f"{_snippet('contact_forms_fts', -1)} AS snippet "
+            f"FROM contact_forms_fts f JOIN contact_forms c ON c.id = f.rowid"
+        )
+    clauses, params = [f"{table} MATCH ?"], [expression]
+    if window is not None:
+        clauses.append(
+            f"f.rowid >= (SELECT COALESCE(MIN(rowid), 0) FROM "
+            f"(SELECT rowid FROM {table} WHERE {table} MATCH ? ORDER BY rowid DESC LIMIT ?))"
+        )
+        params.extend([expression, window])
+    if after is not None:
+        clauses.append("(f.rank > ? OR (f.rank = ? AND f.rowid > ?))")
+        params.extend([after[0], after[0], after[1]])
+    return f"{select} WHERE {' AND '.join(clauses)} ORDER BY f.rank, f.rowid LIMIT ?", params
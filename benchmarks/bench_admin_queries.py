@@ -0,0 +1,285 @@
+"""Benchmark the admin panel's queries before and after the SQLite profile.
+
+Builds a synthetic chat database, then times the dashboard, chats,
+sessions, session-detail, contacts and contact-lookup queries twice: once
+with SQLite defaults and no secondary indexes, and once with the WAL
+pragmas and the indexes declared in src/database/models.py. Then installs
+the dashboard rollups from src/database/rollups.py and compares the
+dashboard read from them with the scans, plus the cost the triggers add to
+inserting messages. Last, builds the FTS5 search indexes from
+src/database/fulltext.py and times the admin search against LIKE scans.
+
+    python benchmarks/bench_admin_queries.py --messages 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), os.path.join(ROOT, "admin_panel")]
+
+from database import fulltext, rollups  # noqa: E402
+from search import match_expression, search_query  # noqa: E402
+
+SCHEMA = [
+    """CREATE TABLE chat_sessions (
+        session_id VARCHAR(36) PRIMARY KEY,
+        user_id VARCHAR(100) NOT NULL,
+        start_time DATETIME NOT NULL
+    )""",
+    """CREATE TABLE chat_messages (
+        id INTEGER PRIMARY KEY,
+        session_id VARCHAR(36) NOT NULL REFERENCES chat_sessions(session_id),
+        sender VARCHAR(50) NOT NULL,
+        content TEXT NOT NULL,
+        timestamp DATETIME NOT NULL
+    )""",
+    """CREATE TABLE contact_forms (
+        id INTEGER PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        email VARCHAR(100) NOT NULL,
+        phone VARCHAR(20) NOT NULL,
+        message TEXT,
+        submission_date DATETIME,
+        status VARCHAR(20),
+        session_id VARCHAR(36)
+    )""",
+]
+
+# Mirrors the indexes declared on the models
+INDEXES = [
+    "CREATE INDEX ix_chat_messages_session_id_timestamp ON chat_messages (session_id, timestamp)",
+    "CREATE INDEX ix_chat_messages_timestamp ON chat_messages (timestamp)",
+    "CREATE INDEX ix_chat_sessions_start_time ON chat_sessions (start_time)",
+    "CREATE INDEX ix_contact_forms_email ON contact_forms (email)",
+    "CREATE INDEX ix_contact_forms_submission_date ON contact_forms (submission_date)",
+]
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA mmap_size={256 * 1024 * 1024}",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+]
+
+SAMPLE_TEXT = [
+    "What services do you offer?",
+    "How much does a mobile app cost?",
+    "We specialize in custom software development. How can I assist you further with this?",
+    "I need an ERP with inventory management",
+    "Our web development team creates modern, responsive websites.",
+]
+
+
+def build_database(path, messages, seed=42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+    session_count = max(messages // 20, 1)
+    start = datetime(2024, 1, 1)
+    sessions = []
+    for i in range(session_count):
+        started = start + timedelta(seconds=i * 60)
+        sessions.append((str(uuid.UUID(int=rng.getrandbits(128))), 'anonymous', started.isoformat(' ')))
+    conn.executemany("INSERT INTO chat_sessions VALUES (?, ?, ?)", sessions)
+
+    def message_rows():
+        for i in range(messages):
+            session_id, _, started = sessions[rng.randrange(session_count)]
+            timestamp = datetime.fromisoformat(started) + timedelta(seconds=rng.randrange(3600))
+            yield (session_id, 'user' if i % 2 == 0 else 'bot',
+                   rng.choice(SAMPLE_TEXT), timestamp.isoformat(' '))
+
+    conn.executemany(
+        "INSERT INTO chat_messages (session_id, sender, content, timestamp) VALUES (?, ?, ?, ?)",
+        message_rows()
+    )
+    conn.executemany(
+        "INSERT INTO contact_forms (name, email, phone, message, submission_date, status, session_id) "
+        "VALUES (?, ?, ?, ?, ?, 'new', ?)",
+        ((f"Lead {i}", f"lead{i}@example.com", "+92 300 0000000", "Interested in ERP",
+          (start + timedelta(minutes=i)).isoformat(' '), sessions[i % session_count][0])
+         for i in range(max(messages // 100, 1)))
+    )
+    conn.commit()
+    conn.close()
+    return sessions
+
+
+def admin_queries(sample_session, sample_email, middle_time):
+    return [
+        ("dashboard: total messages", "SELECT COUNT(*) FROM chat_messages", ()),
+        ("dashboard: total sessions", "SELECT COUNT(DISTINCT session_id) FROM chat_messages", ()),
+        ("dashboard: recent sessions",
+         "SELECT session_id, content, MAX(timestamp) AS last_time FROM chat_messages "
+         "GROUP BY session_id ORDER BY last_time DESC LIMIT 5", ()),
+        ("chats: newest 100",
+         "SELECT id, session_id, sender, content, timestamp FROM chat_messages "
+         "ORDER BY timestamp DESC LIMIT 100", ()),
+        ("chats: keyset page",
+         "SELECT id, session_id, sender, content, timestamp FROM chat_messages "
+         "WHERE timestamp <= ? AND (timestamp < ? OR id < ?) ORDER BY timestamp DESC, id DESC LIMIT 51",
+         (middle_time, middle_time, 0)),
+        ("sessions: keyset page",
+         "SELECT p.session_id, p.start_time, "
+         "(SELECT COUNT(*) FROM chat_messages m WHERE m.session_id = p.session_id), "
+         "(SELECT MAX(m.timestamp) FROM chat_messages m WHERE m.session_id = p.session_id) "
+         "FROM (SELECT session_id, start_time FROM chat_sessions "
+         "WHERE start_time <= ? AND (start_time < ? OR session_id < ?) "
+         "ORDER BY start_time DESC, session_id DESC LIMIT 51) p "
+         "ORDER BY p.start_time DESC, p.session_id DESC",
+         (middle_time, middle_time, "")),
+        ("sessions: summary",
+         "SELECT session_id, COUNT(*), MIN(timestamp) AS start_time, MAX(timestamp) "
+         "FROM chat_messages GROUP BY session_id ORDER BY start_time DESC", ()),
+        ("session detail",
+         "SELECT * FROM chat_messages WHERE session_id = ? ORDER BY timestamp ASC", (sample_session,)),
+        ("contacts", "SELECT * FROM contact_forms ORDER BY submission_date DESC", ()),
+        ("verify contact email",
+         "SELECT id FROM contact_forms WHERE email = ? LIMIT 1", (sample_email,)),
+    ]
+
+
+ROLLUP_QUERIES = [
+    ("dashboard: totals", "SELECT messages, sessions, contacts FROM stats_totals WHERE id = 1", ()),
+    ("dashboard: last 30 days",
+     "SELECT day, messages, sessions, leads FROM stats_daily ORDER BY day DESC LIMIT 30", ()),
+    ("dashboard: recent sessions",
+     "SELECT session_id, last_message, last_time FROM session_activity ORDER BY last_time DESC LIMIT 5", ()),
+]
+
+
+def search_queries(sample_email):
+    """Admin searches, each next to the LIKE scan it replaces"""
+    queries = []
+    for kind, text in [("messages", "ERP"), ("messages", "inventory manag*"),
+                       ("messages", "kubernetes"), ("contacts", sample_email)]:
+        sql, params = search_query(kind, match_expression(text), None)
+        queries.append((f"fts {kind}: {text}", sql, tuple(params) + (51,)))
+    queries += [
+        ("like messages: ERP",
+         "SELECT id, content FROM chat_messages WHERE content LIKE ? ORDER BY id DESC LIMIT 51", ("%ERP%",)),
+        ("like messages: kubernetes",
+         "SELECT id, content FROM chat_messages WHERE content LIKE ? ORDER BY id DESC LIMIT 51",
+         ("%kubernetes%",)),
+        ("like contacts: email",
+         "SELECT id FROM contact_forms WHERE email LIKE ? OR message LIKE ? LIMIT 51",
+         (f"%{sample_email}%", f"%{sample_email}%")),
+    ]
+    return queries
+
+
+def time_inserts(path, sessions, count):
+    """Seconds to insert ``count`` messages in one transaction, rolled back afterwards"""
+    conn = sqlite3.connect(path)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    rows = [(sessions[i % len(sessions)][0], 'user', SAMPLE_TEXT[0], f"2030-01-01 00:00:{i % 60:02d}")
+            for i in range(count)]
+    started = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO chat_messages (session_id, sender, content, timestamp) VALUES (?, ?, ?, ?)", rows
+    )
+    elapsed = time.perf_counter() - started
+    conn.rollback()
+    conn.close()
+    return elapsed
+
+
+def time_queries(path, queries, pragmas, repeat):
+    conn = sqlite3.connect(path)
+    for pragma in pragmas:
+        conn.execute(pragma)
+    results = {}
+    for name, sql, params in queries:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            best = min(best, time.perf_counter() - started)
+        results[name] = best
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_admin_")
+    try:
+        baseline = os.path.join(workdir, "baseline.db")
+        tuned = os.path.join(workdir, "tuned.db")
+
+        started = time.perf_counter()
+        sessions = build_database(baseline, args.messages)
+        print(f"Built {args.messages:,} messages in {time.perf_counter() - started:.1f}s")
+
+        shutil.copyfile(baseline, tuned)
+        conn = sqlite3.connect(tuned)
+        started = time.perf_counter()
+        for statement in INDEXES:
+            conn.execute(statement)
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.close()
+        print(f"Created indexes in {time.perf_counter() - started:.1f}s")
+
+        last_lead = max(args.messages // 100, 1) - 1
+        middle = sessions[len(sessions) // 2]
+        queries = admin_queries(middle[0], f"lead{last_lead}@example.com", middle[2])
+        before = time_queries(baseline, queries, [], args.repeat)
+        after = time_queries(tuned, queries, PRAGMAS, args.repeat)
+
+        print(f"\n{'query':<28} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>9}")
+        for name, _, _ in queries:
+            b, a = before[name] * 1000, after[name] * 1000
+            print(f"{name:<28} {b:>12.2f} {a:>12.2f} {b / a if a else float('inf'):>8.1f}x")
+
+        inserts_before = time_inserts(tuned, sessions, 10_000)
+        conn = sqlite3.connect(tuned)
+        started = time.perf_counter()
+        with conn:
+            for statement in rollups.SCHEMA + rollups.BACKFILL:
+                conn.execute(statement)
+        conn.close()
+        print(f"\nBackfilled dashboard rollups in {time.perf_counter() - started:.1f}s")
+        inserts_after = time_inserts(tuned, sessions, 10_000)
+
+        rollup = time_queries(tuned, ROLLUP_QUERIES, PRAGMAS, args.repeat)
+        print(f"{'query':<28} {'rollup (ms)':>12}")
+        for name, _, _ in ROLLUP_QUERIES:
+            print(f"{name:<28} {rollup[name] * 1000:>12.3f}")
+        print(f"\n10,000 message inserts: {inserts_before * 1000:.0f} ms without triggers, "
+              f"{inserts_after * 1000:.0f} ms with")
+
+        conn = sqlite3.connect(tuned)
+        started = time.perf_counter()
+        with conn:
+            for statement in fulltext.SCHEMA + fulltext.REBUILD + fulltext.OPTIMIZE:
+                conn.execute(statement)
+        conn.close()
+        print(f"\nBuilt full-text indexes in {time.perf_counter() - started:.1f}s")
+        searches = search_queries(f"lead{last_lead}@example.com")
+        timings = time_queries(tuned, searches, PRAGMAS, args.repeat)
+        print(f"{'query':<44} {'ms':>10}")
+        for name, _, _ in searches:
+            print(f"{name:<44} {timings[name] * 1000:>10.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
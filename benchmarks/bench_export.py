@@ -0,0 +1,106 @@
+"""Peak memory and time of the admin panel export, streaming versus fetchall.
+
+Builds a synthetic chat database (see bench_admin_queries.py), then runs
+each export in its own process and reports that process's peak RSS, wall
+time and output size. The fetchall variants reproduce the old /export,
+which loaded every row and built the whole workbook before sending it.
+
+    python benchmarks/bench_export.py --messages 1000000
+    python benchmarks/bench_export.py --variants csv ndjson fetchall-csv
+"""
+import argparse
+import csv
+import io
+import os
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "admin_panel"))
+
+from bench_admin_queries import build_database  # noqa: E402
+from exporter import TABLES, Workbook, export_stream, stream_file, xlsx_file  # noqa: E402
+
+VARIANTS = ["csv", "ndjson", "xlsx", "fetchall-csv", "fetchall-xlsx"]
+
+
+def fetchall_export(path, fmt, out):
+    """The old approach: every row in memory before anything is written"""
+    conn = sqlite3.connect(path)
+    table = TABLES["messages"]
+    rows = conn.execute(f"SELECT {', '.join(table.columns)} FROM {table.table} ORDER BY timestamp").fetchall()
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(table.columns)
+        writer.writerows(rows)
+        out.write(buffer.getvalue().encode("utf-8"))
+    else:
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(table.columns)
+        for row in rows:
+            sheet.append(list(row))
+        workbook.save(out)
+    conn.close()
+
+
+def run_child(path, variant):
+    """Run one export in this process and print: seconds, bytes written, peak RSS in KiB"""
+    started = time.perf_counter()
+    with tempfile.TemporaryFile() as out:
+        if variant.startswith("fetchall-"):
+            fetchall_export(path, variant.split("-", 1)[1], out)
+        elif variant == "xlsx":
+            conn = sqlite3.connect(path)
+            workbook = xlsx_file(conn, "all")
+            conn.close()
+            for chunk in stream_file(workbook):
+                out.write(chunk)
+        else:
+            for chunk in export_stream(sqlite3.connect(path), variant, "messages"):
+                out.write(chunk.encode("utf-8"))
+        size = out.tell()
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(time.perf_counter() - started, size, peak_kib)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--variants", nargs="+", default=VARIANTS, choices=VARIANTS)
+    parser.add_argument("--child", nargs=2, metavar=("DATABASE", "VARIANT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_export_")
+    try:
+        path = os.path.join(workdir, "chat.db")
+        started = time.perf_counter()
+        build_database(path, args.messages)
+        print(f"Built {args.messages:,} messages in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'variant':<16}{'seconds':>10}{'output MB':>12}{'peak RSS MB':>14}")
+        for variant in args.variants:
+            if "xlsx" in variant and Workbook is None:
+                print(f"{variant:<16}  skipped: openpyxl is not installed")
+                continue
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", path, variant],
+                capture_output=True, text=True, check=True
+            )
+            seconds, size, peak_kib = result.stdout.split()
+            print(f"{variant:<16}{float(seconds):>10.1f}{int(size) / 1e6:>12.1f}{int(peak_kib) / 1024:>14.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compare recall, latency and memory of the vector index modes.
+
+Builds every INDEX_MODE over a synthetic corpus of clustered vectors
+standing in for knowledge base chunks, then searches it with held-out
+queries one at a time, as a chat request does. Recall@k is measured against
+exact flat search. Memory is the serialized index size, which is what each
+worker maps. Each query-time setting (nprobe for ivf and pq, efSearch for
+hnsw) gets its own row.
+
+    python benchmarks/bench_index_modes.py
+    python benchmarks/bench_index_modes.py --chunks 100000 --dim 384 --nprobe 4 16 64 --ef-search 32 128
+"""
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from chatbot.vector_index import INDEX_MODES, IndexSettings, build_index, tune_index  # noqa: E402
+
+
+def synthetic_corpus(chunks, dim, topics, queries, seed):
+    """Unit vectors around topic centroids, plus queries drawn from the same topics"""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((topics, dim)).astype(np.float32)
+
+    def sample(count, spread):
+        vectors = centroids[rng.integers(0, topics, count)]
+        vectors = vectors + spread * rng.standard_normal((count, dim)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return sample(chunks, 0.6), sample(queries, 0.6)
+
+
+def search_one_by_one(index, queries, k):
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - started)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies)
+
+
+def recall(found, truth):
+    k = truth.shape[1]
+    return np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=list(INDEX_MODES), choices=INDEX_MODES)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--threads", type=int, default=1,
+                        help="FAISS OpenMP threads; 1 matches a worker serving one query at a time")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    corpus, queries = synthetic_corpus(args.chunks, args.dim, args.topics, args.queries, args.seed)
+    truth_index = faiss.IndexFlatL2(args.dim)
+    truth_index.add(corpus)
+    _, truth = truth_index.search(queries, args.k)
+
+    print(f"{args.chunks} chunks x {args.dim} dims, {args.queries} queries, recall@{args.k}\n")
+    print(f"{'mode':<6}{'setting':<14}{'build s':>9}{'memory MB':>11}{'recall':>9}{'mean ms':>10}{'p95 ms':>10}")
+    for mode in args.modes:
+        settings = IndexSettings(mode)
+        started = time.perf_counter()
+        index = build_index(corpus, settings)
+        build_seconds = time.perf_counter() - started
+        memory_mb = faiss.serialize_index(index).nbytes / 1024 / 1024
+
+        if mode in ("ivf", "pq"):
+            variants = [(f"nprobe={n}", IndexSettings(mode, nprobe=n)) for n in args.nprobe]
+        elif mode == "hnsw":
+            variants = [(f"efSearch={ef}", IndexSettings(mode, ef_search=ef)) for ef in args.ef_search]
+        else:
+            variants = [("exact", settings)]
+
+        for label, variant in variants:
+            tune_index(index, variant)
+            found, latencies = search_one_by_one(index, queries, args.k)
+            print(f"{mode:<6}{label:<14}{build_seconds:>9.1f}{memory_mb:>11.1f}{recall(found, truth):>9.3f}"
+                  f"{latencies.mean() * 1000:>10.3f}{np.percentile(latencies, 95) * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Microbenchmark: per-message intent classification cost.
+
+Compares the keyword scans the handlers used to run on every message (one
+lower() and one any(...) per list) with a single IntentRouter.classify call.
+
+    python benchmarks/bench_intents.py [--iterations N]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from chatbot.intents import INTENT_KEYWORDS, intent_router  # noqa: E402
+
+MESSAGES = [
+    "hi",
+    "What services do you offer?",
+    "How much does a mobile app cost?",
+    "Where are you located?",
+    "I am looking for an ERP with inventory management for my retail business",
+    "Who are you?",
+    "Can you build a website and a chatbot for my restaurant? We need online booking, "
+    "payment integration and an admin dashboard, and I'd like a quote by next week.",
+]
+
+
+def legacy_scan(message: str) -> int:
+    """One lowercase-and-scan per keyword list, as the handlers did"""
+    hits = 0
+    for keywords in INTENT_KEYWORDS.values():
+        if any(keyword in message.lower() for keyword in keywords):
+            hits += 1
+    return hits
+
+
+def router_scan(message: str) -> int:
+    return len(intent_router.classify(message).intents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'message length':>15} {'legacy (us)':>12} {'router (us)':>12} {'speedup':>8}")
+    for message in MESSAGES:
+        assert legacy_scan(message) == router_scan(message)
+        legacy = timeit.timeit(lambda: legacy_scan(message), number=args.iterations)
+        router = timeit.timeit(lambda: router_scan(message), number=args.iterations)
+        legacy_us = legacy / args.iterations * 1e6
+        router_us = router / args.iterations * 1e6
+        print(f"{len(message):>15} {legacy_us:>12.2f} {router_us:>12.2f} {legacy_us / router_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Offline recall@k and latency for the lexical, dense and hybrid retrieval paths.
+
+Indexes the same documents LangChainHandler puts in FAISS, runs a labelled
+query set through each path and reports recall@k plus per-query latency.
+Dense vectors come from an Ollama server when --ollama-url is given;
+otherwise the in-process hashed n-gram backend (EMBEDDING_BACKEND=hashed)
+is used, so the script runs anywhere.
+
+    python benchmarks/eval_retrieval.py --k 1 2 5
+    python benchmarks/eval_retrieval.py --ollama-url http://localhost:11434 --model nomic-embed-text
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from chatbot.embeddings import HashedNgramEmbeddings  # noqa: E402
+from chatbot.ingestion import ingest  # noqa: E402
+from chatbot.retrieval import EmbeddingCache, HybridRetriever, Retriever  # noqa: E402
+
+KB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "src", "knowledge_base", "company_data.json")
+
+# (query, name of the chunk that answers it); "company" is the company overview section
+QUERIES = [
+    ("Tell me about Bitlogicx ERP", "Bitlogicx ERP"),
+    ("restaurant pos", "Restaurant POS"),
+    ("inventory management", "Inventory Management System"),
+    ("do you have a point of sale system", "Point of Sale System"),
+    ("I run a school and need software to manage students", "College/School Management System"),
+    ("online courses platform for my academy", "Learning Management System"),
+    ("travel booking website with itineraries", "Online Tourism Platform"),
+    ("sell used cars online", "Online Car Selling System"),
+    ("grocery delivery app", "Food/Grocery Delivery Application"),
+    ("app to rent cars", "Car Renting App System"),
+    ("marketplace connecting buyers and sellers", "eCommerce Marketplace"),
+    ("fleet tracking and maintenance", "Vehicle Management System"),
+    ("parking lot automation", "Car and Bike Parking Solutions"),
+    ("payroll software", "HR and Payroll Management"),
+    ("tool to plan and monitor projects", "Project Management System"),
+    ("warehouse and purchases tracking", "Inventory Management System"),
+    ("employee data management with slack", "Bitlogicx ERP"),
+    ("tableside ordering for my cafe", "Restaurant POS"),
+    ("checkout system for a retail store", "Point of Sale System"),
+    ("e-learning solution", "Learning Management System"),
+    ("who is bitlogicx", "company"),
+    ("software company delivering innovative solutions", "company"),
+    ("human resources automation", "HR and Payroll Management"),
+    ("hospitality orders and analytics", "Restaurant POS"),
+    ("bike parking", "Car and Bike Parking Solutions"),
+    ("vehicle rental booking", "Car Renting App System"),
+    ("manage my logistics fleet", "Vehicle Management System"),
+    ("online shopping platform", "eCommerce Marketplace"),
+    ("food ordering from restaurants", "Food/Grocery Delivery Application"),
+    ("student management for colleges", "College/School Management System"),
+]
+
+
+class Document:
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+def load_documents(path):
+    """Same chunks KnowledgeBase._build_vector_store indexes, with default chunk sizes"""
+    return [Document(chunk.text, {**chunk.metadata, "chunk_id": chunk.id}) for chunk in ingest([Path(path)])]
+
+
+class OllamaEmbeddings:
+    def __init__(self, base_url, model):
+        self.url = f"{base_url.rstrip('/')}/api/embeddings"
+        self.model = model
+
+    def embed_query(self, text):
+        body = json.dumps({"model": self.model, "prompt": text}).encode()
+        request = urllib.request.Request(self.url, body, {"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.loads(response.read())["embedding"]
+
+    async def aembed_query(self, text):
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+class BruteForceStore:
+    """Exact cosine search standing in for FAISS"""
+
+    def __init__(self, documents, embeddings):
+        self.documents = documents
+        self.vectors = [self._unit(embeddings.embed_query(doc.page_content)) for doc in documents]
+
+    @staticmethod
+    def _unit(vector):
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        query = self._unit(embedding)
+        scored = sorted(
+            ((sum(a * b for a, b in zip(query, vector)), i) for i, vector in enumerate(self.vectors)),
+            reverse=True
+        )
+        return [self.documents[i] for _, i in scored[:k]]
+
+
+class LexicalOnly(HybridRetriever):
+    """BM25 ranking for every query"""
+
+    def _lexical_ranking(self, query):
+        named = self.lexical.name_matches(query)
+        ranked = [doc_id for doc_id, _ in self.lexical.search(query, self.candidates)]
+        return named + [doc_id for doc_id in ranked if doc_id not in named]
+
+
+class FusedOnly(HybridRetriever):
+    """Hybrid fusion for every query, fast path disabled"""
+
+    def _lexical_ranking(self, query):
+        return None
+
+
+def label(document):
+    return document.metadata.get("name") or document.metadata.get("section")
+
+
+def evaluate(retriever, ks, repeat):
+    hits = {k: 0 for k in ks}
+    latencies = []
+    modes = {}
+    for query, expected in QUERIES:
+        for _ in range(repeat):
+            # A fresh cache per query, so every dense lookup pays for its embedding
+            retriever.embedding_cache = EmbeddingCache(retriever.embedding_cache.embeddings, max_size=0)
+            started = time.perf_counter()
+            result = retriever.retrieve(query)
+            latencies.append(time.perf_counter() - started)
+        labels = [label(doc) for doc in result.documents]
+        for k in ks:
+            hits[k] += expected in labels[:k]
+        modes[result.mode] = modes.get(result.mode, 0) + 1
+    latencies.sort()
+    return {
+        "recall": {k: hits[k] / len(QUERIES) for k in ks},
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "modes": modes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 2, 5])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ollama-url", help="embed with this Ollama server instead of hashing")
+    parser.add_argument("--model", default="nomic-embed-text")
+    args = parser.parse_args()
+
+    embeddings = (OllamaEmbeddings(args.ollama_url, args.model) if args.ollama_url
+                  else HashedNgramEmbeddings())
+    documents = load_documents(KB_PATH)
+    store = BruteForceStore(documents, embeddings)
+    cache = EmbeddingCache(embeddings, max_size=0)
+    top_k = max(args.k)
+
+    paths = {
+        "lexical (BM25)": LexicalOnly(store, cache, documents, k=top_k),
+        "dense": Retriever(store, cache, k=top_k),
+        "hybrid (RRF)": FusedOnly(store, cache, documents, k=top_k),
+        "hybrid + fast path": HybridRetriever(store, cache, documents, k=top_k),
+    }
+
+    print(f"{len(QUERIES)} queries over {len(documents)} documents, "
+          f"{'Ollama ' + args.model if args.ollama_url else 'hashed n-gram'} embeddings\n")
+    header = "".join(f"{f'recall@{k}':>11}" for k in args.k)
+    print(f"{'path':<20}{header}{'mean ms':>10}{'p95 ms':>10}  modes")
+    for name, retriever in paths.items():
+        result = evaluate(retriever, args.k, args.repeat)
+        recall = "".join(f"{result['recall'][k]:>11.2f}" for k in args.k)
+        print(f"{name:<20}{recall}{result['mean_ms']:>10.3f}{result['p95_ms']:>10.3f}  {result['modes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Local stand-in for the Ollama HTTP API, for load testing without a GPU.
+
+Implements /api/chat, /api/generate, /api/embeddings and /api/embed with
+configurable first-token latency, generation speed and error rate.
+Responses stream as NDJSON when the request asks for it, like Ollama.
+Embeddings are deterministic hashed bag-of-words vectors, so identical
+text always maps to the same vector.
+
+    python benchmarks/fake_ollama.py --port 11434 --latency 0.3 --tokens-per-sec 40
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+REPLY = ("Thanks for reaching out! Bitlogicx builds custom software, mobile apps and "
+         "websites for businesses of every size. Could you tell me a little more about "
+         "your project so I can point you to the right team?")
+
+
+class FakeOllama:
+    def __init__(self, latency: float = 0.2, tokens_per_sec: float = 40.0,
+                 error_rate: float = 0.0, embedding_dim: int = 256,
+                 reply: str = REPLY, seed: int = 0):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.embedding_dim = embedding_dim
+        self.tokens = reply.split(" ")
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/chat", self.chat)
+        app.router.add_post("/api/generate", self.generate)
+        app.router.add_post("/api/embeddings", self.embeddings)
+        app.router.add_post("/api/embed", self.embed)
+        app.router.add_get("/api/tags", self.tags)
+        return app
+
+    def _fail(self) -> bool:
+        return self.random.random() < self.error_rate
+
+    def embed_text(self, text: str):
+        vector = [0.0] * self.embedding_dim
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.embedding_dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    async def _respond(self, request: web.Request, body: dict, make_chunk):
+        """Send a completion, streamed as NDJSON unless stream is false"""
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if self._fail():
+            return web.json_response({"error": "simulated failure"}, status=500)
+
+        model = body.get("model", "fake")
+        delay = 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        pieces = [token + " " for token in self.tokens[:-1]] + [self.tokens[-1]]
+
+        if body.get("stream", True) is False:
+            await asyncio.sleep(delay * len(pieces))
+            chunk = make_chunk(model, "".join(pieces), True)
+            return web.json_response(chunk)
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for piece in pieces:
+            await response.write((json.dumps(make_chunk(model, piece, False)) + "\n").encode())
+            await asyncio.sleep(delay)
+        await response.write((json.dumps(make_chunk(model, "", True)) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    def _base(model: str, done: bool) -> dict:
+        chunk = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "done": done,
+        }
+        if done:
+            chunk["done_reason"] = "stop"
+        return chunk
+
+    async def chat(self, request: web.Request):
+        body = await request.json()
+
+        def make_chunk(model, content, done):
+            chunk = self._base(model, done)
+            chunk["message"] = {"role": "assistant", "content": content}
+            return chunk
+
+        return await self._respond(request, body, make_chunk)
+
+    async def generate(self, request: web.Request):
+        body = await request.json()
+
+        def make_chunk(model, content, done):
+            chunk = self._base(model, done)
+            chunk["response"] = content
+            return chunk
+
+        return await self._respond(request, body, make_chunk)
+
+    async def embeddings(self, request: web.Request):
+        body = await request.json()
+        self.requests += 1
+        if self._fail():
+            return web.json_response({"error": "simulated failure"}, status=500)
+        return web.json_response({"embedding": self.embed_text(body.get("prompt", ""))})
+
+    async def embed(self, request: web.Request):
+        body = await request.json()
+        self.requests += 1
+        if self._fail():
+            return web.json_response({"error": "simulated failure"}, status=500)
+        inputs = body.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return web.json_response({
+            "model": body.get("model", "fake"),
+            "embeddings": [self.embed_text(text) for text in inputs]
+        })
+
+    async def tags(self, request: web.Request):
+        return web.json_response({"models": [{"name": "vicuna:7b", "model": "vicuna:7b"}]})
+
+
+async def start_fake_ollama(host: str = "127.0.0.1", port: int = 11434, **options):
+    """Start the stub in the running loop; returns (FakeOllama, AppRunner)"""
+    fake = FakeOllama(**options)
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return fake, runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    args = parser.parse_args()
+
+    fake = FakeOllama(args.latency, args.tokens_per_sec, args.error_rate, args.embedding_dim)
+    print(f"Fake Ollama listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency}s, {args.tokens_per_sec} tok/s, error rate {args.error_rate})")
+    web.run_app(fake.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
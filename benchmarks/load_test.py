@@ -0,0 +1,246 @@
+"""Drive the Quart chat app with concurrent simulated conversations.
+
+Starts the fake Ollama server from benchmarks/fake_ollama.py (unless
+--ollama-url points at a real one), serves src/app.py with hypercorn on a
+scratch database, and runs --users conversations of --turns messages each
+against /chat or /chat/stream. Reports latency percentiles, time to first
+byte (first SSE token when streaming), throughput, status codes and the
+rate at which chat messages reached the database.
+
+    python benchmarks/load_test.py --users 50 --turns 5 --latency 0.3 --tokens-per-sec 40
+    python benchmarks/load_test.py --stream --users 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import aiohttp
+
+from fake_ollama import start_fake_ollama
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+MESSAGES = [
+    "What services do you offer?",
+    "How much does a mobile app cost?",
+    "I need an ERP with inventory management",
+    "Do you build websites for restaurants?",
+    "Can you help with an AI chatbot for my store?",
+    "Where is your office located?",
+    "What is your development process like?",
+    "I'm interested, how do we get started?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.ttfb = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def record(self, status, latency, ttfb):
+        self.statuses[status] += 1
+        if status == 200:
+            self.latencies.append(latency)
+            self.ttfb.append(ttfb)
+
+
+async def send_json(http, base_url, message, results):
+    started = time.perf_counter()
+    async with http.post(f"{base_url}/chat", json={"message": message}) as response:
+        ttfb = time.perf_counter() - started
+        await response.read()
+    results.record(response.status, time.perf_counter() - started, ttfb)
+
+
+async def send_stream(http, base_url, message, results):
+    started = time.perf_counter()
+    ttfb = None
+    async with http.post(f"{base_url}/chat/stream", json={"message": message}) as response:
+        if response.status != 200:
+            await response.read()
+            results.record(response.status, time.perf_counter() - started, 0.0)
+            return
+        event = None
+        async for line in response.content:
+            line = line.decode("utf-8").strip()
+            if line.startswith("event:"):
+                event = line.split(":", 1)[1].strip()
+            elif line.startswith("data:"):
+                if ttfb is None and event is None and "token" in json.loads(line[5:]):
+                    ttfb = time.perf_counter() - started
+                if event == "error":
+                    results.errors["sse error event"] += 1
+            elif not line:
+                event = None
+    latency = time.perf_counter() - started
+    results.record(response.status, latency, ttfb if ttfb is not None else latency)
+
+
+async def conversation(base_url, args, results, rng):
+    """One visitor: its own cookie jar, so its own chat session"""
+    send = send_stream if args.stream else send_json
+    jar = aiohttp.CookieJar(unsafe=True)
+    timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+    async with aiohttp.ClientSession(cookie_jar=jar, timeout=timeout) as http:
+        try:
+            async with http.post(f"{base_url}/chat", json={"message": "START_CHAT"}) as response:
+                await response.read()
+            for _ in range(args.turns):
+                await asyncio.sleep(rng.uniform(0, args.think_time))
+                await send(http, base_url, rng.choice(MESSAGES), results)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            results.errors[type(e).__name__] += 1
+
+
+async def serve_app(app, port, shutdown):
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config as HypercornConfig
+
+    config = HypercornConfig()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    await serve(app, config, shutdown_trigger=shutdown.wait)
+
+
+async def wait_until_ready(base_url, attempts=600):
+    """Poll /health until the app has finished building its handlers"""
+    async with aiohttp.ClientSession() as http:
+        for _ in range(attempts):
+            try:
+                async with http.get(f"{base_url}/health") as response:
+                    if response.status == 200:
+                        return await response.json()
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("App did not become ready")
+
+
+async def fetch_status(base_url):
+    async with aiohttp.ClientSession() as http:
+        async with http.get(f"{base_url}/status") as response:
+            return await response.json()
+
+
+async def run(args, workdir):
+    fake = runner = None
+    if args.ollama_url is None:
+        ollama_port = free_port()
+        fake, runner = await start_fake_ollama(
+            "127.0.0.1", ollama_port, latency=args.latency, tokens_per_sec=args.tokens_per_sec,
+            error_rate=args.error_rate, seed=args.seed
+        )
+        args.ollama_url = f"http://127.0.0.1:{ollama_port}"
+
+    db_path = os.path.join(workdir, "load_test.db")
+    # Settings are read at import time, so configure the app before importing it
+    os.environ.update({
+        "OLLAMA_HOST": args.ollama_url,
+        "OLLAMA_API_URL": f"{args.ollama_url}/api/chat",
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "INDEX_CACHE_DIR": os.path.join(workdir, "index"),
+        "RATE_LIMIT_REQUESTS": str(10 ** 9),
+    })
+    sys.path.insert(0, SRC_DIR)
+    logging.disable(logging.WARNING if args.quiet else logging.NOTSET)
+    from app import app
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    shutdown = asyncio.Event()
+    server = asyncio.create_task(serve_app(app, port, shutdown))
+    health = await wait_until_ready(base_url)
+    print(f"App ready after {health['ready_after_seconds']:.2f}s: {health['stages']}")
+
+    results = Results()
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        conversation(base_url, args, results, random.Random(rng.random()))
+        for _ in range(args.users)
+    ])
+    duration = time.perf_counter() - started
+    status = await fetch_status(base_url)
+
+    # Shutting down flushes the write-behind queue
+    shutdown.set()
+    await server
+    if runner is not None:
+        await runner.cleanup()
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT COUNT(*) FROM chat_messages").fetchone()[0]
+    conn.close()
+    return results, duration, rows, status, fake
+
+
+def report(args, results, duration, rows, status, fake):
+    completed = len(results.latencies)
+    mode = "/chat/stream" if args.stream else "/chat"
+    print(f"\n{args.users} users x {args.turns} turns against {mode} in {duration:.1f}s")
+    print(f"  completed       {completed} ok, throughput {completed / duration:.2f} req/s")
+    print(f"  status codes    {dict(results.statuses)}")
+    if results.errors:
+        print(f"  client errors   {dict(results.errors)}")
+    for name, values in (("latency", results.latencies), ("ttfb", results.ttfb)):
+        print(f"  {name:<15} p50 {percentile(values, 50) * 1000:8.1f} ms"
+              f"  p95 {percentile(values, 95) * 1000:8.1f} ms"
+              f"  p99 {percentile(values, 99) * 1000:8.1f} ms")
+    print(f"  db writes       {rows} chat messages, {rows / duration:.1f} rows/s")
+    if fake is not None:
+        print(f"  fake ollama     {fake.requests} requests")
+    print(f"  admission       {json.dumps(status.get('admission', {}))}")
+    print(f"  response cache  {json.dumps(status.get('response_cache', {}))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="concurrent conversations")
+    parser.add_argument("--turns", type=int, default=5, help="messages per conversation")
+    parser.add_argument("--think-time", type=float, default=0.5, help="max seconds between turns")
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream instead of /chat")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--ollama-url", help="use this Ollama server instead of the fake one")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake first-token latency")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quiet", action="store_true", help="only log warnings from the app")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    try:
+        results, duration, rows, status, fake = asyncio.run(run(args, workdir))
+        report(args, results, duration, rows, status, fake)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,21 @@
-from quart import Quart, request, jsonify, render_template, session
-from chatbot.ollama_handler import OllamaHandler
+from quart import Quart, Response, request, jsonify, render_template, session
+from chatbot.knowledge_handler import KnowledgeHandler
+from chatbot.knowledge_store import KnowledgeBase
+from chatbot.langchain_handler import LangChainHandler
+from chatbot.ollama_handler import KNOWLEDGE_BASE_PATH, OllamaHandler
 from database.db_handler import DatabaseHandler
-from config.settings import DATABASE_URI, Config
+from config.settings import (
+    DATABASE_URI, KB_WATCH_INTERVAL, RATE_LIMIT_BY_IP, STARTUP_RETRY_INITIAL, STARTUP_RETRY_MAX,
+    TRUSTED_PROXY_HOPS, Config
+)
+from utils.startup import Startup
+from utils.tracing import registry, span, trace, traced
+from functools import wraps
+import hmac
+import json
 import logging
 import os
+import time
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -13,32 +25,110 @@ app = Quart(__name__)
 app.config.from_object(Config)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key')
 
-ollama_handler = OllamaHandler()
+# Built in the background once the server is up; None until then
+knowledge_base = None
+ollama_handler = None
 db_handler = DatabaseHandler()
+startup = Startup(initial_backoff=STARTUP_RETRY_INITIAL, max_backoff=STARTUP_RETRY_MAX)
+
+async def build_components(startup):
+    """Initialize the database and build the chat handlers, one timed stage each"""
+    global knowledge_base, ollama_handler
+    await startup.stage('database', db_handler.initialize)
+    knowledge_base = await startup.stage(
+        'knowledge_base', KnowledgeBase, KNOWLEDGE_BASE_PATH, in_thread=True
+    )
+    for name, seconds in knowledge_base.timings.items():
+        startup.record(f'knowledge_base.{name}', seconds)
+    langchain_handler = await startup.stage(
+        'langchain_handler', LangChainHandler, knowledge_base, in_thread=True
+    )
+    knowledge_handler = await startup.stage('knowledge_handler', KnowledgeHandler, knowledge_base)
+    ollama_handler = await startup.stage(
+        'ollama_handler', OllamaHandler, langchain_handler, knowledge_handler
+    )
+    knowledge_base.start_watching(KB_WATCH_INTERVAL)
 
 @app.before_serving
-async def initialize_database():
-    await db_handler.initialize()
-    logger.info("Database initialized for the application")
+async def start_components():
+    startup.start(build_components)
+
+@app.after_serving
+async def shutdown():
+    await startup.stop()
+    if knowledge_base is not None:
+        await knowledge_base.stop_watching()
+    if ollama_handler is not None:
+        await ollama_handler.close()
+    # Flush messages still waiting in the write-behind queue
+    await db_handler.close()
+
+def client_ip():
+    """Client address for the per-IP rate limit, or None when IP keying is off.
+
+    Behind TRUSTED_PROXY_HOPS reverse proxies the client is the entry that
+    many places from the end of X-Forwarded-For; earlier entries can be
+    forged by the client.
+    """
+    if not RATE_LIMIT_BY_IP:
+        return None
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.remote_addr
+
+def requires_ready(view):
+    """Answer 503 while the handlers are still being built"""
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        if not startup.ready:
+            return warming_response()
+        return await view(*args, **kwargs)
+    return wrapper
+
+def requires_api_key(view):
+    """Reject requests whose X-API-Key header doesn't match the configured key.
+
+    Answers 404 when no API_KEY is set, rather than accepting the public default.
+    """
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        if not Config.API_KEY_CONFIGURED:
+            return jsonify({'error': 'Not found'}), 404
+        supplied = request.headers.get('X-API-Key', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), Config.API_KEY.encode('utf-8')):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return await view(*args, **kwargs)
+    return wrapper
+
+@app.route('/health', methods=['GET'])
+async def health():
+    """Startup state and per-stage timings; 503 until ready for traffic"""
+    return jsonify(startup.stats()), 200 if startup.ready else 503
 
 @app.route('/')
 async def home():
     return await render_template('chat.html')
 
 @app.route('/chat', methods=['POST'])
+@requires_ready
+@traced('request.chat', root=True)
 async def chat():
     try:
         data = await request.get_json()
         user_input = data.get('message', '').strip()
         
         # Ensure user has a session
-        if 'chat_session_id' not in session:
-            session['chat_session_id'] = await db_handler.create_chat_session(
-                session.get('user_id', 'anonymous')
-            )
+        await ensure_chat_session()
+
+        if user_input != "START_CHAT" and not await ollama_handler.check_rate_limit(
+            session['chat_session_id'], client_ip()
+        ):
+            return rate_limited_response()
 
         # Save user message
-        await db_handler.save_chat_message(
+        await db_handler.queue_chat_message(
             session['chat_session_id'], 
             'user', 
             user_input
@@ -53,10 +143,11 @@ async def chat():
         if not user_input:
             return jsonify({'error': 'No message provided'}), 400
 
-        response = await ollama_handler.get_response(user_input)
+        with span('response'):
+            response = await ollama_handler.get_response(user_input, session['chat_session_id'])
         
         # Save bot response
-        await db_handler.save_chat_message(
+        await db_handler.queue_chat_message(
             session['chat_session_id'], 
             'bot', 
             response
@@ -76,6 +167,79 @@ async def chat():
             'response': 'I apologize, but I encountered an error. Please try again.'
         }), 500
 
+@app.route('/chat/stream', methods=['POST'])
+@requires_ready
+async def chat_stream():
+    """Stream the bot response as Server-Sent Events.
+
+    Each generated fragment is sent as a ``data: {"token": ...}`` event and
+    the full response follows in a final ``done`` event. The bot message is
+    saved once the stream has completed.
+    """
+    data = await request.get_json()
+    user_input = data.get('message', '').strip()
+    if not user_input:
+        return jsonify({'error': 'No message provided'}), 400
+
+    chat_session_id = await ensure_chat_session()
+    if not await ollama_handler.check_rate_limit(chat_session_id, client_ip()):
+        return rate_limited_response()
+    await db_handler.queue_chat_message(chat_session_id, 'user', user_input)
+
+    async def generate():
+        with trace('request.chat_stream', session_id=chat_session_id) as request_trace:
+            chunks = []
+            try:
+                async for chunk in ollama_handler.stream_response(user_input, chat_session_id):
+                    if not chunks:
+                        registry.observe('stream.first_token', time.perf_counter() - request_trace.started)
+                    chunks.append(chunk)
+                    yield format_sse({'token': chunk})
+            except Exception as e:
+                logger.error(f"Error in chat stream: {str(e)}")
+                yield format_sse({
+                    'response': 'I apologize, but I encountered an error. Please try again.'
+                }, event='error')
+                return
+
+            response = ''.join(chunks)
+            await db_handler.queue_chat_message(chat_session_id, 'bot', response)
+            if 'Thank you for providing your information!' in response:
+                await notify_sales_team(ollama_handler.knowledge_handler.lead_collection_state)
+            yield format_sse({'response': response}, event='done')
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+async def ensure_chat_session():
+    """Create a chat session for the current visitor if they don't have one"""
+    if 'chat_session_id' not in session:
+        session['chat_session_id'] = await db_handler.create_chat_session(
+            session.get('user_id', 'anonymous')
+        )
+    return session['chat_session_id']
+
+def warming_response():
+    return jsonify({
+        'error': 'warming',
+        'response': "I'm just getting started. Please try again in a few seconds."
+    }), 503, {'Retry-After': '5'}
+
+def rate_limited_response():
+    return jsonify({
+        'error': 'Rate limit exceeded',
+        'response': "You're sending messages faster than I can keep up with. Please wait a little and try again."
+    }), 429
+
+def format_sse(payload, event=None):
+    """Encode a payload as a single Server-Sent Event"""
+    message = f"data: {json.dumps(payload)}\n\n"
+    if event:
+        message = f"event: {event}\n{message}"
+    return message.encode('utf-8')
+
 async def notify_sales_team(lead_info):
     """Notify sales team about new lead"""
     # Implement notification logic here
@@ -87,6 +251,7 @@ async def info():
     return await jsonify(company_info)
 
 @app.route('/submit-contact', methods=['POST'])
+@requires_ready
 async def submit_contact():
     try:
         contact_data = await request.get_json()
@@ -133,10 +298,61 @@ async def submit_contact():
             'message': 'An unexpected error occurred'
         }), 500
 
+@app.route('/status', methods=['GET'])
+async def status():
+    """Load and cache statistics for sizing the Ollama host"""
+    stats = {'startup': startup.stats()}
+    if ollama_handler is not None:
+        langchain_handler = ollama_handler.langchain_handler
+        stats.update({
+            'admission': ollama_handler.admission.stats(),
+            'response_cache': langchain_handler.response_cache.stats(),
+            'embedding_cache': langchain_handler.embedding_cache.stats(),
+            'retrieval': langchain_handler.retriever.stats(),
+            'knowledge_base': knowledge_base.stats()
+        })
+    if startup.ready:
+        stats['message_writer'] = db_handler.message_writer.stats()
+    return jsonify(stats)
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Stage latency histograms and load gauges in Prometheus text format"""
+    gauges = {'startup': {'ready': int(startup.ready), 'attempts': startup.attempts}}
+    if ollama_handler is not None:
+        langchain_handler = ollama_handler.langchain_handler
+        gauges.update({
+            'admission': ollama_handler.admission.stats(),
+            'response_cache': langchain_handler.response_cache.stats(),
+            'embedding_cache': langchain_handler.embedding_cache.stats(),
+            'retrieval': langchain_handler.retriever.stats(),
+            'rate_limit': {'rejected': ollama_handler.rate_limiter.rejected},
+            'knowledge_base': {'reloads': knowledge_base.reloads, 'chunks': len(knowledge_base.current.chunks)}
+        })
+    if startup.ready:
+        gauges['message_writer'] = db_handler.message_writer.stats()
+    return Response(registry.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/reload-kb', methods=['POST'])
+@requires_api_key
+@requires_ready
+async def reload_knowledge_base():
+    """Re-read the knowledge base files now instead of waiting for the watcher.
+
+    Only this worker reloads directly; other workers pick the change up on
+    their next watch poll and load the index this one saved.
+    """
+    try:
+        return jsonify(await knowledge_base.reload())
+    except Exception as e:
+        logger.error(f"Knowledge base reload failed: {e}")
+        return jsonify({'error': 'Reload failed', 'message': str(e)}), 500
+
 @app.route('/reset-chat', methods=['POST'])
+@requires_ready
 async def reset_chat():
     try:
-        response = await ollama_handler.reset_conversation()
+        response = await ollama_handler.reset_conversation(session.get('chat_session_id'))
         return jsonify({'response': response})
     except Exception as e:
         logger.error(f"Error resetting chat: {e}")
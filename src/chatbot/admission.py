@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot get an LLM slot in time"""
+
+
+class AdmissionController:
+    """Bounds how many LLM generations run against Ollama at once.
+
+    Up to ``max_concurrency`` requests hold a slot; up to ``max_queue`` more
+    wait for one in FIFO order for at most ``queue_timeout`` seconds. Anything
+    beyond that is rejected immediately so callers can answer with a canned
+    fallback instead of piling more work onto a saturated model server.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 16, queue_timeout: float = 15.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.skipped = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @asynccontextmanager
+    async def slot(self, wait: bool = True):
+        """Hold one generation slot for the duration of the block.
+
+        With ``wait=False`` a busy controller rejects at once instead of
+        queueing, so background work never takes a place in line from a user.
+        """
+        started = time.monotonic()
+        with span("admission.wait"):
+            if not self._semaphore.locked():
+                # A slot is free: acquire() returns without suspending
+                await self._semaphore.acquire()
+            else:
+                if not wait:
+                    self.skipped += 1
+                    raise AdmissionRejected("No LLM slot free")
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise AdmissionRejected("LLM wait queue is full")
+                self.waiting += 1
+                acquire = asyncio.ensure_future(self._semaphore.acquire())
+                try:
+                    # Unlike wait_for before 3.12, wait() never reports a timeout for an
+                    # acquire that already succeeded; _abandon hands such a permit back
+                    await asyncio.wait({acquire}, timeout=self.queue_timeout)
+                except BaseException:
+                    self._abandon(acquire)
+                    raise
+                finally:
+                    self.waiting -= 1
+                if not acquire.done():
+                    self._abandon(acquire)
+                    self.timed_out += 1
+                    raise AdmissionRejected(f"No LLM slot free within {self.queue_timeout}s")
+
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited > 1:
+            logger.info(f"Waited {waited:.2f}s for an LLM slot")
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def _abandon(self, acquire: asyncio.Future):
+        """Stop waiting for a permit, releasing it if it was granted in the meantime"""
+        if acquire.cancel():
+            return
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "skipped": self.skipped,
+            "avg_wait_seconds": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait_seconds": self.max_wait
+        }
@@ -0,0 +1,108 @@
+import asyncio
+import math
+import re
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:  # The in-process backend also runs without LangChain, e.g. in benchmarks
+    Embeddings = object
+
+try:
+    from langchain_ollama import OllamaEmbeddings
+except ImportError:
+    OllamaEmbeddings = None
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashedNgramEmbeddings(Embeddings):
+    """In-process embeddings from hashed word and character n-gram counts.
+
+    Each word and each character n-gram of a padded word is hashed into one
+    of ``dim`` signed buckets and the vector is L2-normalised. There is no
+    model to load and no network hop, so a short query embeds in well under
+    a millisecond, and shared n-grams make related word forms ("booking",
+    "bookings", "booked") land close together.
+    """
+
+    def __init__(self, dim: int = 384, ngram_range: Tuple[int, int] = (3, 5), word_weight: float = 2.0):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+
+    @property
+    def name(self) -> str:
+        low, high = self.ngram_range
+        return f"hashed:{self.dim}:{low}-{high}:{self.word_weight}"
+
+    def _add(self, vector: List[float], feature: str, weight: float):
+        digest = zlib.crc32(feature.encode("utf-8"))
+        # The top bit picks the sign so colliding features tend to cancel out
+        vector[digest % self.dim] += weight if digest & 0x80000000 else -weight
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        low, high = self.ngram_range
+        for word in WORD_PATTERN.findall(text.lower()):
+            self._add(vector, word, self.word_weight)
+            padded = f"<{word}>"
+            for size in range(low, high + 1):
+                for start in range(len(padded) - size + 1):
+                    self._add(vector, padded[start:start + size], 1.0)
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # Cheap enough to run on the event loop
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+
+class OllamaEmbeddingBackend(Embeddings):
+    """A dedicated Ollama embedding model, batched through /api/embed.
+
+    Point ``base_url`` at a separate Ollama instance to keep embedding load
+    off the server that runs the chat model.
+    """
+
+    def __init__(self, model: str, base_url: str):
+        if OllamaEmbeddings is None:
+            raise RuntimeError("The ollama embedding backend needs the langchain-ollama package")
+        self.model = model
+        self.client = OllamaEmbeddings(model=model, base_url=base_url)
+
+    @property
+    def name(self) -> str:
+        return f"ollama:{self.model}"
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.client.aembed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.client.aembed_documents(texts)
+
+
+BACKENDS = ("ollama", "hashed")
+
+
+def create_embeddings(backend: str, model: Optional[str] = None, base_url: Optional[str] = None,
+                      dim: int = 384):
+    """Build the configured embedding backend; its ``name`` keys the cached index"""
+    if backend == "ollama":
+        return OllamaEmbeddingBackend(model, base_url)
+    if backend == "hashed":
+        return HashedNgramEmbeddings(dim=dim)
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Union
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; builds are then unsynchronised
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+
+
+class IndexStore:
+    """Disk-backed cache of FAISS vector stores.
+
+    Each index lives in its own directory named after a fingerprint of the
+    knowledge base contents and the embedding model, so a changed file or
+    model produces a new directory instead of reusing stale vectors.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(sources: Iterable[Union[str, Path]], embedding_model: str) -> str:
+        """Hash the embedding model name together with the source file contents"""
+        digest = hashlib.sha256(embedding_model.encode("utf-8"))
+        for source in sorted(Path(s) for s in sources):
+            digest.update(source.name.encode("utf-8"))
+            digest.update(source.read_bytes())
+        return digest.hexdigest()[:16]
+
+    def load_or_build(self, key: str, embeddings, build: Callable[[], FAISS]) -> FAISS:
+        """Return the cached index for key, building and saving it if missing"""
+        path = self.root / key
+        if self._is_complete(path):
+            return self._load(path, embeddings)
+
+        with self._build_lock(key):
+            # Another worker may have finished the build while we waited
+            if self._is_complete(path):
+                return self._load(path, embeddings)
+
+            logger.info(f"Building vector index {key}")
+            store = build()
+            tmp_path = self.root / f".{key}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            store.save_local(str(tmp_path))
+            # rename() is atomic, so readers never see a half-written index
+            os.replace(tmp_path, path)
+            self._prune(keep=key)
+            logger.info(f"Saved vector index {key} to {path}")
+
+        return self._load(path, embeddings)
+
+    def _load(self, path: Path, embeddings) -> FAISS:
+        """Load an index memory-mapped so workers share the page cache"""
+        index = faiss.read_index(
+            str(path / INDEX_FILE),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+        with open(path / DOCSTORE_FILE, "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        logger.info(f"Loaded vector index from {path}")
+        return FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id
+        )
+
+    @staticmethod
+    def _is_complete(path: Path) -> bool:
+        return (path / INDEX_FILE).exists() and (path / DOCSTORE_FILE).exists()
+
+    @contextmanager
+    def _build_lock(self, key: str):
+        """Serialise index builds across processes sharing the cache directory"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.root / f"{key}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _prune(self, keep: str):
+        """Remove indexes built for older knowledge base versions.
+
+        An index whose build lock another process holds is left for a later
+        prune. Lock files are never deleted: a process waiting on one would
+        otherwise lock a file that a newcomer no longer sees.
+        """
+        for entry in self.root.iterdir():
+            if entry.name == keep or not entry.is_dir() or entry.name.startswith("."):
+                continue
+            with self._try_lock(entry.name) as locked:
+                if locked:
+                    shutil.rmtree(entry, ignore_errors=True)
+
+    @contextmanager
+    def _try_lock(self, key: str):
+        """Take key's build lock without waiting; yields whether it was taken"""
+        if fcntl is None:
+            yield True
+            return
+        with open(self.root / f"{key}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
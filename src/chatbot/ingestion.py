@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Union
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF ingestion is optional
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SUFFIXES = (".json", ".md", ".markdown", ".pdf")
+
+# Phrasing templates for the bot, not facts about the company
+EXCLUDED_JSON_KEYS = frozenset({"response_templates"})
+
+# Fields of a named entry that are already in its heading or are not prose
+ENTRY_SKIP_FIELDS = frozenset({"name"})
+
+# Type names the original product/company index entries used in metadata
+JSON_SECTION_TYPES = {"products": "product", "company": "company_info"}
+
+# Bump when chunking output changes so cached indexes are rebuilt
+CHUNKER_VERSION = 2
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)$")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class Chunk:
+    """One retrievable piece of the knowledge base"""
+
+    def __init__(self, text: str, metadata: Dict):
+        self.text = text
+        self.metadata = metadata
+
+    @property
+    def id(self) -> str:
+        """Content hash; unchanged chunks keep their id, and their vectors, across rebuilds"""
+        payload = json.dumps([self.text, self.metadata], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def discover_sources(root: Union[str, Path]) -> List[Path]:
+    """Knowledge base files under root, skipping hidden directories such as the index cache"""
+    root = Path(root)
+    sources = []
+    for path in root.rglob("*"):
+        relative = path.relative_to(root)
+        if any(part.startswith(".") or part == "__pycache__" for part in relative.parts):
+            continue
+        if path.is_file() and path.suffix.lower() in SOURCE_SUFFIXES:
+            sources.append(path)
+    return sorted(sources)
+
+
+def split_text(text: str, max_chars: int = 800, overlap: int = 100) -> List[str]:
+    """Split on paragraphs, then sentences, into pieces of at most max_chars.
+
+    Consecutive pieces of one passage share up to ``overlap`` trailing
+    characters so a fact straddling a boundary is retrievable from either.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            units.append(paragraph)
+            continue
+        for sentence in SENTENCE_END.split(paragraph):
+            # A single run-on sentence is hard-wrapped
+            units.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+
+    pieces = []
+    current = ""
+    for unit in units:
+        candidate = f"{current}\n{unit}" if current else unit
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        pieces.append(current)
+        tail = current[-overlap:] if overlap else ""
+        tail = tail[tail.find(" ") + 1:] if " " in tail else tail
+        current = f"{tail} {unit}" if tail and len(tail) + len(unit) < max_chars else unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _title(key: str) -> str:
+    return key.replace("_", " ").strip().capitalize()
+
+
+def _render(value) -> str:
+    if isinstance(value, list):
+        return ", ".join(_render(item) for item in value)
+    if isinstance(value, dict):
+        return "; ".join(f"{_title(k)}: {_render(v)}" for k, v in value.items())
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return str(value)
+
+
+def _is_named_entry(value) -> bool:
+    return isinstance(value, dict) and isinstance(value.get("name"), str)
+
+
+def _entry_text(entry: Dict) -> str:
+    details = [f"{entry['name']}: {entry.get('description', '')}".rstrip(": ")]
+    for key, value in entry.items():
+        if key in ENTRY_SKIP_FIELDS or key == "description":
+            continue
+        details.append(f"{_title(key)}: {_render(value)}")
+    return "\n".join(details)
+
+
+def _walk_json(node, path: List[str]) -> Iterator[tuple]:
+    """Yield (path, text, extra metadata) sections from a JSON document.
+
+    Lists of named objects such as products become one section per entry.
+    Below the top level, each nested branch becomes one section of
+    "Title: value" lines and a dict's plain values are grouped into one
+    more, so related facts stay together.
+    """
+    if _is_named_entry_list(node):
+        for item in node:
+            yield path, _entry_text(item), {"name": item["name"]}
+    elif isinstance(node, dict) and not path:
+        for key, value in node.items():
+            if key not in EXCLUDED_JSON_KEYS:
+                yield from _walk_json(value, [key])
+    elif isinstance(node, dict) and len(path) == 1:
+        scalars = []
+        for key, value in node.items():
+            if isinstance(value, (dict, list)):
+                yield from _walk_json(value, path + [key])
+            else:
+                scalars.append(f"{_title(key)}: {_render(value)}")
+        if scalars:
+            yield path, "\n".join(scalars), {}
+    elif isinstance(node, dict):
+        yield path, "\n".join(f"{_title(k)}: {_render(v)}" for k, v in node.items()), {}
+    else:
+        yield path, _render(node), {}
+
+
+def _is_named_entry_list(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(_is_named_entry(item) for item in value)
+
+
+def chunks_from_json(path: Path, max_chars: int, overlap: int) -> List[Chunk]:
+    with open(path, "r") as f:
+        data = json.load(f)
+    chunks = []
+    for section_path, text, extra in _walk_json(data, []):
+        section = ".".join(section_path)
+        top = section_path[0] if section_path else "general"
+        doc_type = JSON_SECTION_TYPES.get(top, top)
+        heading = " > ".join(_title(part) for part in section_path)
+        if heading and "name" not in extra:
+            text = f"{heading}\n{text}"
+        for index, piece in enumerate(split_text(text, max_chars, overlap)):
+            metadata = {"source": path.name, "section": section, "type": doc_type, "chunk": index}
+            metadata.update(extra)
+            chunks.append(Chunk(piece, metadata))
+    return chunks
+
+
+def chunks_from_markdown(path: Path, max_chars: int, overlap: int) -> List[Chunk]:
+    """One section per heading, titled with its heading trail"""
+    chunks = []
+    trail: List[str] = []
+    lines: List[str] = []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if not body:
+            return
+        heading = " > ".join(trail)
+        text = f"{heading}\n{body}" if heading else body
+        for index, piece in enumerate(split_text(text, max_chars, overlap)):
+            chunks.append(Chunk(piece, {
+                "source": path.name, "section": heading, "type": "document", "chunk": index
+            }))
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            match = HEADING_PATTERN.match(line.rstrip())
+            if match:
+                flush()
+                lines = []
+                level = len(match.group(1))
+                trail = trail[:level - 1] + [match.group(2).strip()]
+            else:
+                lines.append(line.rstrip())
+    flush()
+    return chunks
+
+
+def chunks_from_pdf(path: Path, max_chars: int, overlap: int) -> List[Chunk]:
+    if PdfReader is None:
+        logger.warning(f"Skipping {path.name}: install pypdf to index PDF files")
+        return []
+    chunks = []
+    for page_number, page in enumerate(PdfReader(str(path)).pages, start=1):
+        text = page.extract_text() or ""
+        for index, piece in enumerate(split_text(text, max_chars, overlap)):
+            chunks.append(Chunk(piece, {
+                "source": path.name, "section": f"page {page_number}", "type": "document",
+                "page": page_number, "chunk": index
+            }))
+    return chunks
+
+
+LOADERS = {
+    ".json": chunks_from_json,
+    ".md": chunks_from_markdown,
+    ".markdown": chunks_from_markdown,
+    ".pdf": chunks_from_pdf,
+}
+
+
+def ingest(sources: Iterable[Path], max_chars: int = 800, overlap: int = 100) -> List[Chunk]:
+    """Chunk every source file; a file that fails to parse is logged and skipped"""
+    chunks = []
+    for source in sources:
+        loader = LOADERS.get(source.suffix.lower())
+        if loader is None:
+            continue
+        try:
+            loaded = loader(source, max_chars, overlap)
+        except Exception as e:
+            logger.error(f"Error ingesting {source}: {e}")
+            continue
+        logger.debug(f"Ingested {len(loaded)} chunks from {source.name}")
+        chunks.extend(loaded)
+    return chunks
+
+
+def embed_in_batches(embeddings, texts: Sequence[str], batch_size: int = 32) -> List[List[float]]:
+    """Embed documents a batch per request instead of one round-trip each"""
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(list(texts[start:start + batch_size])))
+    return vectors
+
+
+def chunk_settings_key(max_chars: int, overlap: int) -> str:
+    """Folded into the index fingerprint so changing how text is chunked rebuilds the index"""
+    return f"chunks:v{CHUNKER_VERSION}:{max_chars}:{overlap}"
@@ -0,0 +1,130 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+# Keyword lists for every intent the handlers check. Matching keeps the old
+# ``keyword in text.lower()`` substring semantics, and the order of each list
+# is preserved for handlers that act on the first matching keyword.
+INTENT_KEYWORDS: Dict[str, Sequence[str]] = {
+    "quote": ('quote', 'price', 'cost', 'charges', 'pricing', 'package', 'rates'),
+    "identity": ('who are you', 'what are you', 'who is your', 'who made you'),
+    "interest": (
+        "interested", "want", "looking for", "need", "help",
+        "how much", "price", "cost", "pricing", "quote",
+        "estimate", "consultation", "discuss", "more info"
+    ),
+    "sales_interest": (
+        'interested', 'want', 'need', 'looking for', 'how much',
+        'price', 'cost', 'develop', 'create', 'build'
+    ),
+    "service": ('service', 'offer', 'provide', 'help', 'do'),
+    "pricing": ('price', 'cost', 'pricing', 'charges'),
+    "service_type": ('development', 'integration', 'automation', 'consulting'),
+    "location": ('location', 'where'),
+    "address": ('where', 'located', 'address', 'place'),
+    "product": ('inventory', 'erp', 'management'),
+    "food": ('food', 'burger', 'pizza', 'restaurant'),
+    "ai": ('ai', 'chatbot', 'bot'),
+    "process": ('process', 'approach', 'methodology'),
+    "project": ('app', 'application', 'mobile', 'website', 'software', 'system'),
+    "solution": ('software', 'development', 'solution'),
+    "mobile": ('app', 'mobile'),
+    "web": ('web', 'website'),
+}
+
+GREETINGS = frozenset(['hi', 'hello', 'hey', 'greetings'])
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Build a regex alternation factored by common prefixes.
+
+    Python's re tries alternatives one by one, so sharing prefixes keeps the
+    work per character close to constant. Optional suffixes are greedy, so
+    at each position the longest keyword is the one that matches.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1:
+            body = branches[0]
+            if terminal:
+                return f"(?:{body})?" if len(body) > 1 else f"{body}?"
+            return body
+        body = f"(?:{'|'.join(branches)})"
+        return f"{body}?" if terminal else body
+
+    return build(trie)
+
+
+class IntentResult:
+    """Every keyword and intent found in one message"""
+
+    __slots__ = ("text", "keywords", "intents", "_router")
+
+    def __init__(self, text: str, keywords: FrozenSet[str], intents: FrozenSet[str], router: "IntentRouter"):
+        self.text = text
+        self.keywords = keywords
+        self.intents = intents
+        self._router = router
+
+    def has(self, intent: str) -> bool:
+        return intent in self.intents
+
+    def matches(self, intent: str) -> List[str]:
+        """Matched keywords of an intent, in the order the intent lists them"""
+        if intent not in self.intents:
+            return []
+        return [k for k in self._router.intent_keywords[intent] if k in self.keywords]
+
+    def first(self, intent: str) -> Optional[str]:
+        matched = self.matches(intent)
+        return matched[0] if matched else None
+
+    @property
+    def is_greeting(self) -> bool:
+        return self.text.strip() in GREETINGS
+
+    def __repr__(self) -> str:
+        return f"IntentResult(intents={sorted(self.intents)})"
+
+
+class IntentRouter:
+    """Classifies a message against all intents in a single regex pass.
+
+    Every keyword is compiled into one prefix-factored pattern wrapped in a
+    lookahead, so ``findall`` reports the longest keyword starting at each
+    position, including overlapping ones. Shorter keywords that are
+    prefixes of a match are added from a precomputed table, which gives
+    exactly the set of keywords that are substrings of the message.
+    """
+
+    def __init__(self, intent_keywords: Dict[str, Sequence[str]] = None):
+        self.intent_keywords = dict(intent_keywords or INTENT_KEYWORDS)
+        keywords = {k for words in self.intent_keywords.values() for k in words}
+        self._pattern = re.compile(f"(?=({_trie_pattern(keywords)}))")
+        self._prefixes = {
+            k: frozenset(p for p in keywords if k.startswith(p)) for k in keywords
+        }
+        self._keyword_intents: Dict[str, FrozenSet[str]] = {
+            k: frozenset(i for i, words in self.intent_keywords.items() if k in words)
+            for k in keywords
+        }
+
+    def classify(self, message: str) -> IntentResult:
+        text = message.lower()
+        longest = set(self._pattern.findall(text))
+        keywords = frozenset().union(*(self._prefixes[k] for k in longest))
+        intents = frozenset().union(*(self._keyword_intents[k] for k in keywords))
+        return IntentResult(text, keywords, intents, self)
+
+
+intent_router = IntentRouter()
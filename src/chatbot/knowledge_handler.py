@@ -1,16 +1,19 @@
-import json
-from pathlib import Path
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
 from .conversation_manager import ConversationManager
+from .intents import IntentResult, intent_router
+from .knowledge_store import KnowledgeBase, KnowledgeVersion
+from .lexical_index import BM25Index
 
 logger = logging.getLogger(__name__)
 
 class KnowledgeHandler:
-    def __init__(self):
-        self.knowledge_base = self._load_knowledge_base()
-        self.templates = self.knowledge_base.get("response_templates", {})
+    def __init__(self, kb: KnowledgeBase):
+        # Parsed once by the shared knowledge base and replaced when it reloads
+        self.kb = kb
+        self.product_index = self._build_product_index()
+        kb.subscribe(self._on_knowledge_reload)
         self.last_context = None
         self.context_count = {}
         self.lead_collection_state = {
@@ -26,14 +29,16 @@ class KnowledgeHandler:
         self.conversation_manager = ConversationManager()
         self.current_session_id = None
 
-    def _load_knowledge_base(self):
-        try:
-            kb_path = Path(__file__).parent.parent / "knowledge_base" / "company_data.json"
-            with open(kb_path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading knowledge base: {e}")
-            return {}
+    @property
+    def knowledge_base(self) -> dict:
+        return self.kb.data
+
+    @property
+    def templates(self) -> dict:
+        return self.knowledge_base.get("response_templates", {})
+
+    def _on_knowledge_reload(self, version: KnowledgeVersion):
+        self.product_index = self._build_product_index()
 
     def start_new_session(self, user_id: str):
         """Start new conversation session"""
@@ -64,6 +69,7 @@ class KnowledgeHandler:
 
     def _generate_response(self, query: str) -> str:
         """Generate response (moved from get_context)"""
+        intent = intent_router.classify(query)
         # Handle unclear queries
         if query.strip() in self.unclear_responses:
             if self.previous_context:
@@ -76,7 +82,7 @@ class KnowledgeHandler:
 
         # Handle completely irrelevant queries
         if not self._is_relevant_to_previous_context(query):
-            if any(word in query.lower() for word in ['food', 'burger', 'pizza', 'restaurant']):
+            if intent.has("food"):
                 return ("I apologize, but I can only assist with software development related queries. "
                        "I cannot help with food orders or restaurant recommendations. "
                        "Would you like to discuss your software development needs instead?")
@@ -94,17 +100,16 @@ class KnowledgeHandler:
                    "Or would you like to start a new topic about our services?")
 
         # First check if it's an initial greeting
-        greeting_words = ['hi', 'hello', 'hey', 'greetings']
-        if any(word == query.lower().strip() for word in greeting_words):
+        if intent.is_greeting:
             return self.get_greeting()
             
         # Check for service-related queries
-        if any(service in query.lower() for service in ['development', 'integration', 'automation', 'consulting']):
+        if intent.has("service_type"):
             services = self.knowledge_base['services']
             return f"We specialize in {services['general']}. Our key services include {', '.join(services['specific'])}. Would you like to know more about any specific service?"
             
         # Handle AI/chatbot specific queries
-        if any(term in query.lower() for term in ['ai', 'chatbot', 'bot']):
+        if intent.has("ai"):
             return """We offer comprehensive AI and chatbot solutions including:
 • Custom AI-powered chatbots
 • Natural Language Processing integration
@@ -114,22 +119,21 @@ class KnowledgeHandler:
 Would you like to discuss your specific requirements?"""
         
         # Check for development process queries
-        if any(term in query.lower() for term in ['process', 'approach', 'methodology']):
+        if intent.has("process"):
             process = self.knowledge_base['custom_solutions']['development_process']
             return f"Our development process includes: {', '.join(process)}"
             
         # Then check for location and other queries
-        if 'location' in query.lower() or 'where' in query.lower():
+        if intent.has("location"):
             return f"Bitlogicx is located at {self.knowledge_base['company']['location']}"
         
-        if self._shows_interest(query):
-            return self._get_sales_context(query)
+        if self._shows_interest(intent):
+            return self._get_sales_context(intent)
 
         # Check for project interest keywords
-        project_keywords = ['app', 'application', 'mobile', 'website', 'software', 'system']
-        if any(keyword in query.lower() for keyword in project_keywords):
+        if intent.has("project"):
             self.lead_collection_state["collecting"] = True
-            self.lead_collection_state["project_type"] = next((k for k in project_keywords if k in query.lower()), None)
+            self.lead_collection_state["project_type"] = intent.first("project")
             return """Great! We specialize in building custom mobile applications. To better understand your requirements and provide you with detailed information, could you please share:
 
 1. Your name
@@ -139,13 +143,13 @@ Would you like to discuss your specific requirements?"""
 
 Please start by telling me your name."""
 
-        context = self._get_general_context(query)
+        context = self._get_general_context(intent)
         self._update_context_keywords(context)
         return context
 
-    def _get_general_context(self, query: str) -> str:
+    def _get_general_context(self, intent: IntentResult) -> str:
         """Get general context for basic queries"""
-        if any(word in query.lower() for word in ['where', 'located', 'address', 'place']):
+        if intent.has("address"):
             return f"We are located at {self.knowledge_base['company']['location']}. Would you like to schedule a visit or discuss your requirements?"
 
     def _is_business_query(self, query: str) -> bool:
@@ -181,27 +185,18 @@ Please start by telling me your name."""
         return context
 
     def _find_relevant_products(self, query: str) -> List[Dict]:
-        """Find products relevant to the query"""
+        """Find products relevant to the query, products named outright first"""
         products = self.knowledge_base.get("products", [])
-        scored_products = []
-        
-        for product in products:
-            score = self._calculate_relevance(query, product)
-            if score > 0:
-                scored_products.append((score, product))
-        
-        return [p[1] for p in sorted(scored_products, reverse=True)]
-
-    def _calculate_relevance(self, query: str, product: Dict) -> float:
-        """Calculate relevance score for a product"""
-        score = 0
-        if product["name"].lower() in query:
-            score += 2
-        if any(word in product["description"].lower() for word in query.split()):
-            score += 1
-        if product["use_case"].lower() in query:
-            score += 1.5
-        return score
+        named = self.product_index.name_matches(query)
+        ranked = [doc_id for doc_id, _ in self.product_index.search(query, k=len(products))]
+        return [products[doc_id] for doc_id in named + [d for d in ranked if d not in named]]
+
+    def _build_product_index(self) -> BM25Index:
+        products = self.knowledge_base.get("products", [])
+        return BM25Index(
+            [f"{p['name']} {p['description']} {p.get('use_case', '')}" for p in products],
+            [p["name"] for p in products]
+        )
 
     def _is_service_query(self, query: str) -> bool:
         """Determine if query is about services"""
@@ -225,30 +220,26 @@ Please start by telling me your name."""
         return {
             'has_email': bool(re.search(email_pattern, query)),
             'has_phone': bool(re.search(phone_pattern, query)),
-            'has_interest': self._shows_interest(query)
+            'has_interest': self._shows_interest(intent_router.classify(query))
         }
 
-    def _shows_interest(self, query: str) -> bool:
+    def _shows_interest(self, intent: IntentResult) -> bool:
         """Detect if user shows interest in services"""
-        interest_signals = [
-            'interested', 'want', 'need', 'looking for', 'how much',
-            'price', 'cost', 'develop', 'create', 'build'
-        ]
-        return any(signal in query.lower() for signal in interest_signals)
+        return intent.has("sales_interest")
 
-    def _get_sales_context(self, query: str) -> str:
+    def _get_sales_context(self, intent: IntentResult) -> str:
         """Get sales-focused context prioritizing services"""
         context = []
         
         # Lead with services
-        if any(service in query.lower() for service in ['software', 'development', 'solution']):
+        if intent.has("solution"):
             context.append(self.knowledge_base['custom_solutions']['description'])
             context.append("Our process includes requirements analysis, design, development, testing, deployment, and ongoing support.")
         
         # Add specific service context
-        if 'app' in query.lower() or 'mobile' in query.lower():
+        if intent.has("mobile"):
             context.append("We specialize in mobile app development using React Native.")
-        elif 'web' in query.lower() or 'website' in query.lower():
+        elif intent.has("web"):
             context.append("Our web development team creates modern, responsive websites.")
             
         # Add call to action
@@ -280,7 +271,7 @@ Please start by telling me your name."""
 In the meantime, would you like to know more about our development process or previous similar projects?"""
             return "Please provide a valid phone number."
             
-        return self._get_sales_context(query)
+        return self._get_sales_context(intent_router.classify(query))
 
     def _save_lead(self) -> None:
         """Save lead information to database"""
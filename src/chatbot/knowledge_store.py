@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from config.settings import (
+    INDEX_CACHE_DIR, EMBEDDING_BACKEND, EMBEDDING_MODEL, EMBEDDING_HOST, EMBEDDING_DIM, EMBEDDING_CACHE_SIZE,
+    CHUNK_MAX_CHARS, CHUNK_OVERLAP, EMBEDDING_BATCH_SIZE, RETRIEVAL_K,
+    INDEX_MODE, INDEX_NLIST, INDEX_NPROBE, INDEX_HNSW_M, INDEX_EF_CONSTRUCTION, INDEX_EF_SEARCH,
+    INDEX_PQ_M, INDEX_PQ_BITS
+)
+from .embeddings import create_embeddings
+from .index_store import IndexStore
+from .ingestion import Chunk, chunk_settings_key, discover_sources, embed_in_batches, ingest
+from .retrieval import EmbeddingCache, HybridRetriever, stored_documents
+from .vector_index import IndexSettings, build_index, stored_vectors, tune_index
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeVersion:
+    """One consistent version of the knowledge base, swapped in as a whole"""
+
+    def __init__(self, version: str, data: dict, sources: List[Path], chunks: List[Chunk],
+                 vector_store: FAISS, retriever: HybridRetriever, mtimes: Dict[Path, Tuple[int, int]]):
+        self.version = version
+        self.data = data
+        self.sources = sources
+        self.chunks = chunks
+        self.vector_store = vector_store
+        self.retriever = retriever
+        self.mtimes = mtimes
+
+
+class KnowledgeBase:
+    """The knowledge base files, their chunks and vector index, shared by every handler.
+
+    ``reload`` re-chunks the files and embeds only chunks whose content hash
+    is new, reusing the stored vectors of the rest. The replacement index and
+    retriever are built off the event loop and published with a single
+    assignment, so requests already running finish on the version they
+    started with and none wait on the rebuild.
+    """
+
+    def __init__(self, data_path: Union[str, Path], embeddings=None,
+                 index_settings: Optional[IndexSettings] = None):
+        self.data_path = Path(data_path)
+        # Every JSON, Markdown and PDF file next to the main data file is indexed
+        self.root = self.data_path.parent
+        self.embeddings = embeddings or create_embeddings(
+            EMBEDDING_BACKEND, EMBEDDING_MODEL, EMBEDDING_HOST, dim=EMBEDDING_DIM
+        )
+        self.index_settings = index_settings or IndexSettings(
+            INDEX_MODE, nlist=INDEX_NLIST, nprobe=INDEX_NPROBE, hnsw_m=INDEX_HNSW_M,
+            ef_construction=INDEX_EF_CONSTRUCTION, ef_search=INDEX_EF_SEARCH,
+            pq_m=INDEX_PQ_M, pq_bits=INDEX_PQ_BITS
+        )
+        self.index_store = IndexStore(INDEX_CACHE_DIR)
+        self.embedding_cache = EmbeddingCache(self.embeddings, max_size=EMBEDDING_CACHE_SIZE)
+        # Seconds spent in each slow part of the last load, for the startup breakdown
+        self.timings: Dict[str, float] = {}
+        self.reloads = 0
+        self.last_reload: Optional[dict] = None
+        self._listeners: List[Callable[[KnowledgeVersion], None]] = []
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self.current, _ = self._load(None)
+
+    @property
+    def version(self) -> str:
+        return self.current.version
+
+    @property
+    def data(self) -> dict:
+        return self.current.data
+
+    @property
+    def retriever(self) -> HybridRetriever:
+        return self.current.retriever
+
+    def subscribe(self, listener: Callable[[KnowledgeVersion], None]):
+        """Call listener with each new version once it is live"""
+        self._listeners.append(listener)
+
+    async def reload(self) -> dict:
+        """Pick up changed files; a reload with no content change only refreshes mtimes"""
+        async with self._lock:
+            started = time.perf_counter()
+            previous = self.current
+            loaded, embedded = await asyncio.to_thread(self._load, previous)
+            result = {
+                "changed": loaded is not previous,
+                "version": loaded.version,
+                "chunks": len(loaded.chunks),
+                "embedded": embedded,
+                "seconds": round(time.perf_counter() - started, 3)
+            }
+            if loaded is not previous:
+                self.current = loaded
+                self.reloads += 1
+                for listener in self._listeners:
+                    listener(loaded)
+                logger.info(f"Knowledge base reloaded to {loaded.version}: {len(loaded.chunks)} chunks, "
+                            f"{embedded} embedded, {result['seconds']}s")
+            self.last_reload = result
+            return result
+
+    def _load(self, previous: Optional[KnowledgeVersion]) -> Tuple[KnowledgeVersion, int]:
+        """Build a version from the files on disk, or return previous if their content is unchanged"""
+        started = time.perf_counter()
+        sources = discover_sources(self.root)
+        mtimes = _stat(sources)
+        # Parse the main file first: a half-written save fails the reload and keeps the old version
+        with open(self.data_path, 'r') as f:
+            data = json.load(f)
+        key = IndexStore.fingerprint(
+            sources,
+            f"{self.embeddings.name}|{chunk_settings_key(CHUNK_MAX_CHARS, CHUNK_OVERLAP)}|"
+            f"{self.index_settings.key()}"
+        )
+        if previous is not None and key == previous.version:
+            previous.mtimes = mtimes
+            return previous, 0
+        chunks = ingest(sources, CHUNK_MAX_CHARS, CHUNK_OVERLAP)
+        self.timings['knowledge_base'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        reusable = _stored_vectors(previous.vector_store) if previous is not None else {}
+        embedded = []
+        vector_store = self.index_store.load_or_build(
+            key, self.embeddings, lambda: self._build_vector_store(chunks, reusable, embedded)
+        )
+        tune_index(vector_store.index, self.index_settings)
+        self.timings['vector_store'] = time.perf_counter() - started
+
+        retriever = HybridRetriever(
+            vector_store, self.embedding_cache, stored_documents(vector_store), k=RETRIEVAL_K
+        )
+        if previous is not None:
+            # Keep the retrieval counters monotonic across versions for /metrics
+            retriever.lexical_count = previous.retriever.lexical_count
+            retriever.hybrid_count = previous.retriever.hybrid_count
+        version = KnowledgeVersion(key, data, sources, chunks, vector_store, retriever, mtimes)
+        return version, sum(embedded)
+
+    def _build_vector_store(self, chunks: List[Chunk], reusable: Dict[str, List[float]],
+                            embedded: List[int]) -> FAISS:
+        unique = list({chunk.id: chunk for chunk in chunks}.values())
+        if not unique:
+            raise ValueError(f"No knowledge base content found in {self.root}")
+        missing = [chunk for chunk in unique if chunk.id not in reusable]
+        fresh = embed_in_batches(self.embeddings, [chunk.text for chunk in missing], EMBEDDING_BATCH_SIZE)
+        vectors = dict(reusable)
+        vectors.update(zip((chunk.id for chunk in missing), fresh))
+        embedded.append(len(missing))
+        logger.info(f"Embedded {len(missing)} of {len(unique)} knowledge base chunks, "
+                    f"reused {len(unique) - len(missing)} stored vectors")
+        index = build_index(np.array([vectors[chunk.id] for chunk in unique]), self.index_settings)
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore({
+                # chunk_id tells apart chunks with the same text under different sections or files
+                chunk.id: Document(page_content=chunk.text, metadata={**chunk.metadata, "chunk_id": chunk.id})
+                for chunk in unique
+            }),
+            index_to_docstore_id={position: chunk.id for position, chunk in enumerate(unique)}
+        )
+
+    def changed_on_disk(self) -> bool:
+        """Whether any source file was added, removed or modified since the last load"""
+        return _stat(discover_sources(self.root)) != self.current.mtimes
+
+    def start_watching(self, interval: float):
+        """Poll the source files every interval seconds and reload on change; 0 disables"""
+        if interval > 0 and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch(interval))
+
+    async def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.changed_on_disk):
+                    await self.reload()
+            except Exception as e:
+                logger.error(f"Knowledge base reload failed, keeping version {self.version}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "sources": len(self.current.sources),
+            "chunks": len(self.current.chunks),
+            "index_mode": self.index_settings.mode,
+            "reloads": self.reloads,
+            "watching": self._watch_task is not None,
+            "last_reload": self.last_reload
+        }
+
+
+def _stat(sources: List[Path]) -> Dict[Path, Tuple[int, int]]:
+    stats = {}
+    for source in sources:
+        try:
+            result = source.stat()
+        except FileNotFoundError:
+            continue
+        stats[source] = (result.st_mtime_ns, result.st_size)
+    return stats
+
+
+def _stored_vectors(vector_store: FAISS) -> Dict[str, List[float]]:
+    """Vectors of the current index keyed by chunk id, so unchanged chunks are not re-embedded"""
+    try:
+        matrix = stored_vectors(vector_store.index)
+    except RuntimeError as e:
+        logger.info(f"Index cannot return its stored vectors, re-embedding every chunk: {e}")
+        return {}
+    if matrix is None:
+        # Product-quantized codes are lossy; embed again rather than compound the error
+        return {}
+    return {doc_id: matrix[position].tolist()
+            for position, doc_id in vector_store.index_to_docstore_id.items()}
@@ -1,74 +1,94 @@
-from langchain_community.vectorstores import FAISS
-from langchain_ollama import OllamaEmbeddings
 from langchain_ollama import OllamaLLM
 from langchain.chains import LLMChain
 from langchain_core.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
-import json
+from config.settings import (
+    OLLAMA_HOST, SESSION_MAX_COUNT, SESSION_TTL, SESSION_TURN_WINDOW, SESSION_MAX_CHARS,
+    RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIZE,
+    LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT,
+    PROMPT_TOKEN_BUDGET, PROMPT_RESPONSE_RESERVE, PROMPT_CONTEXT_MAX_TOKENS,
+    PROMPT_SUMMARY_MAX_TOKENS,
+    RETRIEVAL_K, SERVICE_CONTEXT_K,
+    SUMMARY_TRIGGER_TURNS, SUMMARY_KEEP_TURNS, SUMMARY_MAX_CHARS,
+    SUMMARY_MAX_CONCURRENCY, SUMMARY_USE_LLM
+)
+from database.db_handler import DatabaseHandler
+from .admission import AdmissionController, AdmissionRejected
+from .knowledge_store import KnowledgeBase, KnowledgeVersion
+from .prompt_builder import PromptBuilder, format_turns
+from .intents import IntentResult, intent_router
+from .response_cache import SemanticResponseCache
+from .retrieval import EmbeddingCache, HybridRetriever, RetrievalResult
+from .session_store import ConversationSession, SessionStore
+from .summarizer import ConversationSummarizer
+from utils.tracing import span
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
 import logging
 import re  # Add this import
 
 logger = logging.getLogger(__name__)
 
 class LangChainHandler:
-    def __init__(self, knowledge_base_path):
-        self.llm = OllamaLLM(model="vicuna:7b")
-        self.embeddings = OllamaEmbeddings(model="vicuna:7b")
-        self.memory = ConversationBufferMemory(
-            memory_key="history",
-            input_key="input",
-            return_messages=True
+    def __init__(self, kb: KnowledgeBase):
+        self.llm = OllamaLLM(model="vicuna:7b", base_url=OLLAMA_HOST)
+        # Shared with KnowledgeHandler; swaps in a new index when the files change
+        self.kb = kb
+        self.sessions = SessionStore(
+            max_sessions=SESSION_MAX_COUNT,
+            ttl=SESSION_TTL,
+            turn_window=SESSION_TURN_WINDOW,
+            max_session_chars=SESSION_MAX_CHARS
+        )
+        self.response_cache = SemanticResponseCache(
+            threshold=RESPONSE_CACHE_THRESHOLD,
+            ttl=RESPONSE_CACHE_TTL,
+            max_entries=RESPONSE_CACHE_SIZE,
+            version=kb.version
+        )
+        kb.subscribe(self._on_knowledge_reload)
+        # Caps concurrent generations against the single Ollama instance. Only
+        # the LLM calls hold a slot, so cache hits never queue behind them.
+        self.admission = AdmissionController(
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            max_queue=LLM_MAX_QUEUE,
+            queue_timeout=LLM_QUEUE_TIMEOUT
         )
-        self.knowledge_base = self._load_knowledge_base(knowledge_base_path)
-        self.vector_store = self._create_vector_store()
         self.conversation_chain = self._create_conversation_chain()
-        # Add conversation state initialization
-        self.conversation_state = {
-            "collecting_contact": False,
-            "name": None,
-            "email": None,
-            "phone": None,
-            "interest": None,
-            "last_response": None,
-            "price_discussed": False,
-            "greeting_shown": False  # Add this flag
-        }
+        self.prompt_builder = PromptBuilder(
+            self.conversation_chain.prompt.template,
+            budget=PROMPT_TOKEN_BUDGET,
+            response_reserve=PROMPT_RESPONSE_RESERVE,
+            context_max_tokens=PROMPT_CONTEXT_MAX_TOKENS,
+            summary_max_tokens=PROMPT_SUMMARY_MAX_TOKENS
+        )
+        self.summarizer = ConversationSummarizer(
+            self.llm if SUMMARY_USE_LLM else None,
+            max_chars=SUMMARY_MAX_CHARS,
+            admission=self.admission
+        )
+        self.db = DatabaseHandler()
+        # Folds run in the background; keep references so they aren't garbage collected
+        self._summary_tasks = set()
+        self._summary_slots = asyncio.Semaphore(SUMMARY_MAX_CONCURRENCY)
 
-    async def reset_conversation(self):
+    async def reset_conversation(self, session_id: Optional[str] = None):
         """Reset the conversation state and memory"""
-        self.conversation_state = {
-            "collecting_contact": False,
-            "name": None,
-            "email": None,
-            "phone": None,
-            "interest": None,
-            "last_response": None,
-            "price_discussed": False,
-            "greeting_shown": False
-        }
-        self.memory.clear()
+        self.sessions.reset(session_id)
+        if session_id:
+            await self.db.delete_conversation_summary(session_id)
         return "Hello! I'm Bito, how can I assist you today?"
 
-    def _load_knowledge_base(self, path):
-        with open(path, 'r') as f:
-            return json.load(f)
+    @property
+    def retriever(self) -> HybridRetriever:
+        return self.kb.retriever
 
-    def _create_vector_store(self):
-        # Convert knowledge base to documents
-        texts = []
-        metadatas = []
-        
-        # Add company info
-        texts.append(self.knowledge_base['company']['description'])
-        metadatas.append({'type': 'company_info'})
-        
-        # Add products
-        for product in self.knowledge_base['products']:
-            texts.append(f"{product['name']}: {product['description']}")
-            metadatas.append({'type': 'product', 'name': product['name']})
-        
-        # Create vector store
-        return FAISS.from_texts(texts, self.embeddings, metadatas=metadatas)
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self.kb.embedding_cache
+
+    def _on_knowledge_reload(self, version: KnowledgeVersion):
+        # Answers cached against the old knowledge base must not be served
+        self.response_cache.set_version(version.version)
 
     def _create_conversation_chain(self):
         template = """You are Bito, Bitlogicx's professional sales assistant. Follow these guidelines:
@@ -104,15 +124,14 @@ class LangChainHandler:
         return LLMChain(
             llm=self.llm,
             prompt=prompt,
-            memory=self.memory,
             verbose=True,
             output_key="text"
         )
 
-    def _enhance_product_context(self, query: str) -> str:
+    def _enhance_product_context(self, intent: IntentResult, state: dict) -> str:
         # Check for pricing related queries
-        if any(word in query.lower() for word in ['price', 'cost', 'pricing', 'charges']):
-            self.conversation_state["price_discussed"] = True
+        if intent.has("pricing"):
+            state["price_discussed"] = True
             return "Our pricing varies based on project requirements. For accurate pricing, we'd need to understand your specific needs through a consultation."
 
         # Check for service-related queries
@@ -123,12 +142,12 @@ class LangChainHandler:
             'consulting': 'Consultation services are available at $150/hour with package options available.'
         }
         
-        for keyword, context in service_contexts.items():
-            if keyword in query.lower():
-                return context
+        service_type = intent.first("service_type")
+        if service_type in service_contexts:
+            return service_contexts[service_type]
 
         # Then check for location and product contexts
-        if 'location' in query.lower() or 'where' in query.lower():
+        if intent.has("location"):
             return "Bitlogicx is located at A5 Commercial Block A, Architects Engineers Housing Society, Lahore, Pakistan"
         product_contexts = {
             'inventory': 'Our Inventory Management System offers comprehensive features including real-time tracking, automated reordering, and detailed analytics.',
@@ -136,88 +155,223 @@ class LangChainHandler:
             'management': 'We offer specialized management solutions tailored to your business needs.'
         }
         
-        for keyword, context in product_contexts.items():
-            if keyword in query.lower():
-                return context
+        product = intent.first("product")
+        if product in product_contexts:
+            return product_contexts[product]
         return ""
 
     def get_relevant_context(self, query):
         # Search vector store for relevant context
-        docs = self.vector_store.similarity_search(query, k=2)
-        return "\n".join(doc.page_content for doc in docs)
+        return self.retriever.retrieve(query).context
 
-    async def get_response(self, user_input: str) -> str:
+    async def get_response(self, user_input: str, session_id: Optional[str] = None,
+                           intent: Optional[IntentResult] = None) -> str:
         try:
-            # Check for name introduction
-            name_patterns = [
-                r"(?i)i am (\w+)",
-                r"(?i)my name is (\w+)",
-                r"(?i)this is (\w+)",
-                r"(?i)(\w+) here"
-            ]
-            
-            import re
-            for pattern in name_patterns:
-                match = re.search(pattern, user_input)
-                if match:
-                    self.conversation_state["name"] = match.group(1).capitalize()
-                    if not self.conversation_state["greeting_shown"]:
-                        self.conversation_state["greeting_shown"] = True
-                        return f"Nice to meet you {self.conversation_state['name']}! I'm Bito, your AI assistant from Bitlogicx. How can I help you today?"
-
-            # Use name in responses if available
-            if self.conversation_state["name"] and not self._shows_interest(user_input):
-                context = self.get_relevant_context(user_input)
-                enhanced_context = f"Remember to address the user as {self.conversation_state['name']}. {context}"
-            else:
-                context = self.get_relevant_context(user_input)
-                enhanced_context = context
-
-            # Check for service-related queries
-            service_keywords = ['service', 'offer', 'provide', 'help', 'do']
-            if any(keyword in user_input.lower() for keyword in service_keywords):
-                context = self._get_service_context()
-                combined_context = f"{context}\n{self.get_relevant_context(user_input)}"
-            else:
-                # Enhance context with pricing information
-                context = self.get_relevant_context(user_input)
-                enhanced_context = self._enhance_product_context(user_input)
-                combined_context = f"{context}\n{enhanced_context}" if enhanced_context else context
+            intent = intent or intent_router.classify(user_input)
+            conversation = await self._get_conversation(session_id)
+            introduction = self._handle_introduction(user_input, conversation.state)
+            if introduction:
+                return introduction
 
             # Normal conversation flow with enhanced context
-            response = await self.conversation_chain.ainvoke({
-                "input": user_input,
-                "context": combined_context
-            })
-            
+            version = self.kb.version
+            chain_inputs, retrieval = await self._build_chain_inputs(user_input, conversation, intent)
+            cacheable = self._is_cacheable(conversation)
+            text = None
+            if cacheable:
+                with span("response_cache.lookup"):
+                    text = self.response_cache.lookup(
+                        retrieval.embedding, chain_inputs["context"], query=user_input
+                    )
+            if text is None:
+                async with self.admission.slot():
+                    with span("llm"):
+                        response = await self.conversation_chain.ainvoke(chain_inputs)
+                text = response["text"]
+                if cacheable:
+                    self.response_cache.store(
+                        retrieval.embedding, chain_inputs["context"], text, version, query=user_input
+                    )
+
             # Post-process response
-            processed_response = self._post_process_response(response["text"], user_input)
-            self.conversation_state["last_response"] = processed_response
+            with span("post_process"):
+                conversation.record_turn(user_input, text)
+                processed_response = self._post_process_response(text, user_input)
+            conversation.state["last_response"] = processed_response
+            self._schedule_summary(session_id, conversation)
             return processed_response
-            
+
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             return "I apologize, but I encountered an error. Could you please rephrase your question?"
 
-    def _get_service_context(self) -> str:
-        """Get comprehensive service context"""
-        services = self.knowledge_base['services']
-        solutions = self.knowledge_base['custom_solutions']
-        
-        return f"""
-Our core services include:
-• {', '.join(services['specific'])}
-
-Development Process:
-• {', '.join(solutions['development_process'])}
+    async def stream_response(self, user_input: str, session_id: Optional[str] = None,
+                              intent: Optional[IntentResult] = None) -> AsyncIterator[str]:
+        """Yield the response as the LLM generates it.
 
-Industries we serve:
-• {', '.join(solutions['industries_served'][:5])}
+        Post-processing can only run on the complete text, so anything it
+        appends is yielded as a final chunk once generation has finished.
+        """
+        chunks = []
+        try:
+            intent = intent or intent_router.classify(user_input)
+            conversation = await self._get_conversation(session_id)
+            introduction = self._handle_introduction(user_input, conversation.state)
+            if introduction:
+                yield introduction
+                return
+
+            # The greeting reply ignores the LLM output, so skip generating it
+            if self._is_greeting(user_input):
+                yield self._post_process_response("", user_input)
+                return
+
+            version = self.kb.version
+            chain_inputs, retrieval = await self._build_chain_inputs(user_input, conversation, intent)
+            cacheable = self._is_cacheable(conversation)
+            cached = None
+            if cacheable:
+                with span("response_cache.lookup"):
+                    cached = self.response_cache.lookup(
+                        retrieval.embedding, chain_inputs["context"], query=user_input
+                    )
+            if cached is not None:
+                chunks.append(cached)
+                yield cached
+            else:
+                streaming_chain = self.conversation_chain.prompt | self.llm
+                # Includes the time the client takes to consume each chunk
+                async with self.admission.slot():
+                    with span("llm"):
+                        async for chunk in streaming_chain.astream(chain_inputs):
+                            chunks.append(chunk)
+                            yield chunk
+                if cacheable:
+                    self.response_cache.store(
+                        retrieval.embedding, chain_inputs["context"], "".join(chunks), version,
+                        query=user_input
+                    )
+
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            if not chunks:
+                yield "I apologize, but I encountered an error. Could you please rephrase your question?"
+            return
+
+        raw_response = "".join(chunks)
+        conversation.record_turn(user_input, raw_response)
+        processed_response = self._post_process_response(raw_response, user_input)
+        conversation.state["last_response"] = processed_response
+        self._schedule_summary(session_id, conversation)
+
+        streamed = raw_response.strip()
+        if processed_response.startswith(streamed):
+            remainder = processed_response[len(streamed):]
+            if remainder:
+                yield remainder
+
+    def _handle_introduction(self, user_input: str, state: dict) -> Optional[str]:
+        """Remember the user's name and greet them the first time they give it"""
+        # Check for name introduction
+        name_patterns = [
+            r"(?i)i am (\w+)",
+            r"(?i)my name is (\w+)",
+            r"(?i)this is (\w+)",
+            r"(?i)(\w+) here"
+        ]
+        
+        for pattern in name_patterns:
+            match = re.search(pattern, user_input)
+            if match:
+                state["name"] = match.group(1).capitalize()
+                if not state["greeting_shown"]:
+                    state["greeting_shown"] = True
+                    return f"Nice to meet you {state['name']}! I'm Bito, your AI assistant from Bitlogicx. How can I help you today?"
+        return None
+
+    async def _build_chain_inputs(self, user_input: str, conversation: ConversationSession,
+                                  intent: IntentResult) -> Tuple[dict, RetrievalResult]:
+        """Assemble history and the retrieved and enhanced context for the conversation chain"""
+        # Embed and search once per turn; every branch reuses the same hits.
+        # Service questions draw on more chunks, since the answer spans several sections.
+        k = SERVICE_CONTEXT_K if intent.has("service") else RETRIEVAL_K
+        retrieval = await self.retriever.aretrieve(user_input, k=k)
+        with span("prompt"):
+            chain_inputs = self._assemble_chain_inputs(user_input, conversation, intent, retrieval)
+        return chain_inputs, retrieval
+
+    def _assemble_chain_inputs(self, user_input: str, conversation: ConversationSession,
+                               intent: IntentResult, retrieval: RetrievalResult) -> dict:
+        state = conversation.state
+        context = retrieval.context
 
-Technologies:
-• Frontend: {', '.join(solutions['technologies']['frontend'][:3])}
-• Backend: {', '.join(solutions['technologies']['backend'][:3])}
-"""
+        # Check for service-related queries
+        if intent.has("service"):
+            # Services, process, technologies and industries come from the retrieved chunks
+            combined_context = context
+        else:
+            # Enhance context with pricing information
+            enhanced_context = self._enhance_product_context(intent, state)
+            combined_context = f"{context}\n{enhanced_context}" if enhanced_context else context
+
+        # Use name in responses if available
+        if state["name"] and not self._shows_interest(intent):
+            combined_context = f"Remember to address the user as {state['name']}. {combined_context}"
+
+        # Trim to the token budget, dropping the oldest turns first
+        return self.prompt_builder.build(
+            user_input, combined_context, conversation.messages, summary=conversation.summary
+        ).inputs
+
+    async def _get_conversation(self, session_id: Optional[str]) -> ConversationSession:
+        """Session from the store, resuming its persisted summary the first time this worker sees it"""
+        conversation = self.sessions.get(session_id)
+        if not conversation.restored:
+            conversation.restored = True
+            if session_id:
+                stored = await self.db.get_conversation_summary(session_id)
+                if stored is not None:
+                    conversation.summary = stored.summary
+                    conversation.summarized_turns = stored.summarized_turns
+        return conversation
+
+    def _schedule_summary(self, session_id: Optional[str], conversation: ConversationSession):
+        """Start folding older turns into the summary once the session passes the trigger"""
+        folded = conversation.turns_to_fold(SUMMARY_TRIGGER_TURNS, SUMMARY_KEEP_TURNS)
+        if not folded:
+            return
+        conversation.folding = True
+        task = asyncio.create_task(self._fold_summary(session_id, conversation, folded))
+        self._summary_tasks.add(task)
+        task.add_done_callback(self._summary_tasks.discard)
+
+    async def _fold_summary(self, session_id: Optional[str], conversation: ConversationSession,
+                            folded: List):
+        try:
+            async with self._summary_slots:
+                with span("summary.fold"):
+                    summary = await self.summarizer.fold(conversation.summary, format_turns(folded))
+            conversation.apply_summary(summary, folded)
+            logger.debug(f"Folded {len(folded) // 2} turns into the summary for session {session_id}")
+            if session_id:
+                await self.db.save_conversation_summary(session_id, summary, conversation.summarized_turns)
+        except Exception as e:
+            logger.error(f"Error summarizing conversation {session_id}: {e}")
+        finally:
+            conversation.folding = False
+
+    def _is_cacheable(self, conversation: ConversationSession) -> bool:
+        """Shared responses are only safe when no per-user state shapes the prompt"""
+        # History and summary go into the prompt but not the cache key, so only
+        # a session's first turn may be answered from, or stored in, the cache.
+        # Lexical fast-path hits without an embedding still match exact repeats.
+        return (not conversation.state["name"]
+                and not conversation.messages
+                and not conversation.summary)
 
     def _format_initial_greeting(self) -> str:
         return """**Welcome to Bitlogicx!**
@@ -227,7 +381,7 @@ I'm Bito, your AI assistant. How may I help you today?"""
     def _post_process_response(self, response: str, user_input: str) -> str:
         """Enhance response based on context and user input"""
         # Handle initial greeting
-        if user_input.lower() in ['hi', 'hello', 'hey']:
+        if self._is_greeting(user_input):
             return "Hello! I'm Bito, your AI assistant from Bitlogicx. How can I help you today?"
 
         # Clean up response
@@ -239,8 +393,10 @@ I'm Bito, your AI assistant. How may I help you today?"""
 
         return response
 
-    def _process_contact_info(self, input_text: str) -> str:
-        state = self.conversation_state
+    def _is_greeting(self, user_input: str) -> bool:
+        return user_input.lower() in ['hi', 'hello', 'hey']
+
+    def _process_contact_info(self, input_text: str, state: dict) -> str:
         
         if not state.get("name"):
             state["name"] = input_text
@@ -274,19 +430,13 @@ I'm Bito, your AI assistant. How may I help you today?"""
 
 Would you like to schedule a consultation for detailed pricing based on your requirements?"""
 
-    def _shows_interest(self, text: str) -> bool:
-        interest_keywords = [
-            "interested", "want", "looking for", "need", "help",
-            "how much", "price", "cost", "pricing", "quote",
-            "estimate", "consultation", "discuss", "more info"
-        ]
-        return any(keyword in text.lower() for keyword in interest_keywords)
+    def _shows_interest(self, intent: IntentResult) -> bool:
+        return intent.has("interest")
 
-    def _is_contact_info_request(self) -> bool:
-        return self.conversation_state.get("collecting_contact", False)
+    def _is_contact_info_request(self, state: dict) -> bool:
+        return state.get("collecting_contact", False)
 
-    def _get_contact_collection_prompt(self) -> str:
-        state = self.conversation_state
+    def _get_contact_collection_prompt(self, state: dict) -> str:
         if not state.get("name"):
             state["collecting_contact"] = True
             return "To better assist you, could you please share your name?"
@@ -0,0 +1,91 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from have how i in is it me my
+of on or our so that the this to us we what which with would you your about
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with plural 's' stripped"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of texts, with an inverted index built once.
+
+    A query only touches the postings of its own terms, so scoring costs
+    microseconds against the whole knowledge base. Optional ``names`` give
+    each document a title; ``name_matches`` finds titles that appear
+    verbatim in a query.
+    """
+
+    def __init__(self, texts: Sequence[str], names: Sequence[str] = (), k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths = []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings[term].append((doc_id, frequency))
+        self.postings = dict(self.postings)
+        self.average_length = sum(self.lengths) / self.size if self.size else 0.0
+        self.idf = {
+            term: math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        self.names = [tuple(tokenize(name)) if name else () for name in names]
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.postings
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Top k (doc_id, score) pairs; documents sharing no term with the query are left out"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def name_matches(self, query: str) -> List[int]:
+        """Documents whose whole name occurs in the query, longest name first"""
+        tokens = tokenize(query)
+        matches = []
+        for doc_id, name in enumerate(self.names):
+            if name and _contains_sequence(tokens, name):
+                matches.append(doc_id)
+        return sorted(matches, key=lambda doc_id: len(self.names[doc_id]), reverse=True)
+
+
+def _contains_sequence(tokens: List[str], sequence: Tuple[str, ...]) -> bool:
+    width = len(sequence)
+    return any(tuple(tokens[i:i + width]) == sequence for i in range(len(tokens) - width + 1))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[int]:
+    """Merge ranked id lists; each list contributes 1 / (k + rank) per id"""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
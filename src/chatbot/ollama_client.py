@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {502, 503, 504}
+
+
+class OllamaClient:
+    """Asyncio client for the Ollama HTTP API.
+
+    All requests share one keep-alive connection pool bounded by
+    max_connections. Every call runs under a deadline, and because requests
+    are awaited inside ``async with`` blocks, cancelling the calling task
+    (e.g. Quart cancelling a handler when the browser disconnects) closes
+    the in-flight connection instead of leaving the generation running.
+    """
+
+    def __init__(self, api_url: str, max_connections: int = 10,
+                 connect_timeout: float = 5, request_timeout: float = 30,
+                 keepalive_timeout: float = 60, retries: int = 3,
+                 backoff_factor: float = 0.5):
+        self.api_url = api_url
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the pooled session lazily so it binds to the running loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def chat(self, model: str, messages: List[Dict[str, str]],
+                   timeout: Optional[float] = None) -> str:
+        """Send a non-streaming chat request and return the message content"""
+        payload = {"model": model, "messages": messages, "stream": False}
+        data = await self._post_json(payload, timeout or self.request_timeout)
+        return data.get('message', {}).get('content', '')
+
+    async def stream_chat(self, model: str, messages: List[Dict[str, str]],
+                          timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content fragments as they arrive.
+
+        Ollama streams NDJSON, one object per generated chunk. The deadline
+        applies to the gap between chunks rather than the whole generation,
+        so long answers are not cut off while they are still producing
+        tokens. Streams are not retried once started.
+        """
+        payload = {"model": model, "messages": messages, "stream": True}
+        stream_timeout = aiohttp.ClientTimeout(
+            total=None,
+            connect=self.connect_timeout,
+            sock_read=timeout or self.request_timeout
+        )
+        async with self._get_session().post(
+            self.api_url, json=payload, timeout=stream_timeout
+        ) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise aiohttp.ClientPayloadError(chunk['error'])
+                content = chunk.get('message', {}).get('content', '')
+                if content:
+                    yield content
+                if chunk.get('done'):
+                    break
+
+    async def _post_json(self, payload: Dict, timeout: float) -> Dict:
+        """POST with retries on gateway errors, all within one overall deadline"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        attempt = 0
+
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError("Ollama request deadline exceeded")
+            request_timeout = aiohttp.ClientTimeout(
+                total=remaining,
+                connect=min(self.connect_timeout, remaining)
+            )
+            try:
+                async with self._get_session().post(
+                    self.api_url, json=payload, timeout=request_timeout
+                ) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason
+                        )
+                    response.raise_for_status()
+                    return await response.json()
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError) as e:
+                retryable = (isinstance(e, aiohttp.ClientConnectionError)
+                             or e.status in RETRY_STATUSES)
+                if not retryable or attempt >= self.retries:
+                    raise
+                delay = self.backoff_factor * (2 ** attempt)
+                attempt += 1
+                logger.warning(f"Ollama request failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+
+    async def close(self):
+        """Close the connection pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -1,37 +1,55 @@
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import os
+import asyncio
+import aiohttp
 import logging
 import json
-import time
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional
 from pathlib import Path
+from config.settings import (
+    OLLAMA_API_URL, OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_CONNECT_TIMEOUT, OLLAMA_REQUEST_TIMEOUT,
+    RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW, RATE_LIMIT_BACKEND, RATE_LIMIT_DB
+)
 from .knowledge_handler import KnowledgeHandler
+from .knowledge_store import KnowledgeBase
+from .admission import AdmissionRejected
+from .intents import IntentResult, intent_router
 from .langchain_handler import LangChainHandler
+from .ollama_client import OllamaClient
+from .rate_limiter import create_rate_limiter
+from utils.tracing import span, traced
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+KNOWLEDGE_BASE_PATH = Path(__file__).parent.parent / "knowledge_base" / "company_data.json"
+
+BUSY_RESPONSE = ("I'm helping a lot of people right now. Please try again in a moment, "
+                 "or share your email and our team will get back to you.")
+
 class OllamaHandler:
-    def __init__(self):
-        # Create session with retry strategy
-        self.session = requests.Session()
-        retries = Retry(
-            total=3,
-            backoff_factor=0.5,
-            status_forcelist=[502, 503, 504],
-            allowed_methods=["POST"]
+    def __init__(self, langchain_handler: Optional[LangChainHandler] = None,
+                 knowledge_handler: Optional[KnowledgeHandler] = None):
+        # Pooled asyncio client; never blocks the event loop
+        self.api_url = OLLAMA_API_URL
+        self.client = OllamaClient(
+            self.api_url,
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            connect_timeout=OLLAMA_CONNECT_TIMEOUT,
+            request_timeout=OLLAMA_REQUEST_TIMEOUT
         )
-        self.session.mount('http://', HTTPAdapter(max_retries=retries))
         
         # Initialize other attributes
-        self.api_url = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/chat")
         self.model = "vicuna:7b"  # Specify the model you're using
-        kb_path = Path(__file__).parent.parent / "knowledge_base" / "company_data.json"
-        self.langchain_handler = LangChainHandler(kb_path)
-        self.knowledge_handler = KnowledgeHandler()
+        # The app builds these off the event loop and passes them in
+        if langchain_handler is None or knowledge_handler is None:
+            kb = KnowledgeBase(KNOWLEDGE_BASE_PATH)
+            langchain_handler = langchain_handler or LangChainHandler(kb)
+            knowledge_handler = knowledge_handler or KnowledgeHandler(kb)
+        self.langchain_handler = langchain_handler
+        self.knowledge_handler = knowledge_handler
+        # Direct Ollama fallbacks share the LangChain handler's generation slots
+        self.admission = langchain_handler.admission
         self.system_prompt = """I am Bito, developed by Bitlogicx. My primary goals are:
         1. Always identify myself as 'Bito, developed by Bitlogicx' when asked about my identity
         2. Collect customer information (name, email, service interest)
@@ -45,9 +63,14 @@ class OllamaHandler:
             "style": "conversational",
             "format": "direct"
         }
-        self.requests_per_hour = 100  # Adjust this based on your needs
-        self.request_timestamps = []
-        self.window_size = 3600  # 1 hour in seconds
+        self.requests_per_hour = RATE_LIMIT_REQUESTS
+        self.window_size = RATE_LIMIT_WINDOW
+        self.rate_limiter = create_rate_limiter(
+            self.requests_per_hour,
+            self.window_size,
+            backend=RATE_LIMIT_BACKEND,
+            path=RATE_LIMIT_DB
+        )
         self.conversation_state = {
             "initialized": False,
             "customer_data": {
@@ -67,58 +90,74 @@ class OllamaHandler:
         }
         logger.debug(f"Initialized OllamaHandler with API URL: {self.api_url} and rate limit: {self.requests_per_hour} requests per hour")
 
-    def _check_rate_limit(self) -> bool:
-        """Check if we're within rate limits"""
-        current_time = time.time()
-        # Remove timestamps older than our window
-        self.request_timestamps = [ts for ts in self.request_timestamps 
-                                 if current_time - ts < self.window_size]
-        
-        return len(self.request_timestamps) < self.requests_per_hour
-
-    def _update_rate_limit(self):
-        """Update the request timestamps"""
-        self.request_timestamps.append(time.time())
+    @traced("rate_limit")
+    async def check_rate_limit(self, session_id: Optional[str], client_ip: Optional[str]) -> bool:
+        """Count a request against both the chat session's and the client IP's budget"""
+        keys = [f"session:{session_id}"] if session_id else []
+        if client_ip:
+            keys.append(f"ip:{client_ip}")
+        if not keys:
+            return True
+        return await self.rate_limiter.ahit(keys)
 
-    def send_query_to_ollama(self, query: str, context: str, timeout: tuple = (5, 30)) -> Optional[str]:
+    async def send_query_to_ollama(self, query: str, context: str, timeout: Optional[float] = None) -> Optional[str]:
         """Sends a query to the Ollama API with improved error handling"""
         try:
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "system", "content": f"Context: {context}"} if context else {"role": "system", "content": "No specific context available."},
-                    {"role": "user", "content": query}
-                ],
-                "stream": False  # Disable streaming for better error handling
-            }
+            messages = self._build_messages(query, context)
+            return await self.client.chat(self.model, messages, timeout=timeout)
 
-            response = self.session.post(
-                self.api_url,
-                json=payload,
-                timeout=timeout
-            )
-            
-            response.raise_for_status()
-            return response.json().get('message', {}).get('content', '')
-            
-        except requests.exceptions.RequestException as e:
+        except asyncio.TimeoutError as e:
+            logger.error(f"Request timed out: {str(e)}")
+            return "Error: The request timed out. Please try again."
+
+        except aiohttp.ClientConnectionError as e:
+            logger.error(f"Request failed: {str(e)}")
+            return "Error: Could not connect to Ollama API. Please ensure the service is running."
+
+        except aiohttp.ClientError as e:
             logger.error(f"Request failed: {str(e)}")
-            if isinstance(e, requests.exceptions.ConnectionError):
-                return "Error: Could not connect to Ollama API. Please ensure the service is running."
-            elif isinstance(e, requests.exceptions.Timeout):
-                return "Error: The request timed out. Please try again."
             return "Error: Failed to process your request. Please try again."
             
         except Exception as e:
             logger.error(f"Unexpected error in send_query_to_ollama: {str(e)}")
             return None
 
-    async def reset_conversation(self):
+    async def _fallback_response(self, user_input: str) -> Optional[str]:
+        """Direct Ollama call, served from the response cache when possible"""
+        cache = self.langchain_handler.response_cache
+        try:
+            embedding = await self.langchain_handler.embedding_cache.aembed_query(user_input)
+        except Exception as e:
+            logger.debug(f"Skipping response cache, embedding failed: {e}")
+            embedding = None
+
+        if embedding is not None:
+            cached = cache.lookup(embedding, "")
+            if cached is not None:
+                return cached
+
+        async with self.admission.slot():
+            response = await self.send_query_to_ollama(user_input, "")
+        if embedding is not None and response and not response.startswith("Error:"):
+            cache.store(embedding, "", response)
+        return response
+
+    def _build_messages(self, query: str, context: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "system", "content": f"Context: {context}"} if context else {"role": "system", "content": "No specific context available."},
+            {"role": "user", "content": query}
+        ]
+
+    async def close(self):
+        """Release the pooled Ollama connections"""
+        await self.client.close()
+
+    async def reset_conversation(self, session_id: Optional[str] = None):
         """Reset both Ollama and LangChain conversation states"""
         try:
             # Reset LangChain conversation
-            response = await self.langchain_handler.reset_conversation()
+            response = await self.langchain_handler.reset_conversation(session_id)
             
             # Reset local state
             self.conversation_history = []
@@ -131,34 +170,41 @@ class OllamaHandler:
             logger.error(f"Error resetting conversation: {e}")
             return "I've reset our conversation. How can I help you today?"
 
-    async def get_response(self, user_input: str) -> str:
+    async def get_response(self, user_input: str, session_id: Optional[str] = None) -> str:
+        # Classify once; every handler below reuses the result
+        with span("intent"):
+            intent = intent_router.classify(user_input)
+
         # Check for quote/pricing related queries first
-        if self._is_quote_request(user_input):
-            return self._handle_quote_request(user_input)
+        if self._is_quote_request(intent):
+            return self._handle_quote_request(intent)
             
         # Add identity check before normal response handling
-        identity_keywords = ['who are you', 'what are you', 'who is your', 'who made you']
-        if any(keyword in user_input.lower() for keyword in identity_keywords):
+        if intent.has("identity"):
             return "I am Bito, developed by Bitlogicx. How can I assist you today?"
             
         try:
-            # Add timeout for API calls
-            timeout = (5, 30)  # (connect timeout, read timeout)
-            
             # First try LangChain handler
             try:
-                return await self.langchain_handler.get_response(user_input)
+                return await self.langchain_handler.get_response(user_input, session_id, intent)
+            except AdmissionRejected:
+                raise
             except Exception as e:
                 logger.warning(f"LangChain handler failed: {e}, falling back to direct Ollama API")
                 
                 # Fallback to direct Ollama API
-                response = self.send_query_to_ollama(user_input, "", timeout=timeout)
+                with span("fallback"):
+                    response = await self._fallback_response(user_input)
                 if response:
                     return response
                 
                 raise Exception("Both handlers failed to generate response")
+
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected LLM request: {e}")
+            return BUSY_RESPONSE
                 
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
             logger.error(f"Connection error with Ollama API: {e}")
             return "I apologize, but I'm having trouble connecting to my language model. Please try again in a moment."
             
@@ -166,16 +212,61 @@ class OllamaHandler:
             logger.error(f"Unexpected error in get_response: {e}")
             return "I apologize, but I encountered an error. Please try again or rephrase your question."
 
-    def _is_quote_request(self, query: str) -> bool:
+    async def stream_response(self, user_input: str, session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Streaming counterpart of get_response, yielding text chunks"""
+        with span("intent"):
+            intent = intent_router.classify(user_input)
+        if self._is_quote_request(intent):
+            yield self._handle_quote_request(intent)
+            return
+
+        if intent.has("identity"):
+            yield "I am Bito, developed by Bitlogicx. How can I assist you today?"
+            return
+
+        try:
+            async for chunk in self._stream_generation(user_input, session_id, intent):
+                yield chunk
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected LLM request: {e}")
+            yield BUSY_RESPONSE
+
+    async def _stream_generation(self, user_input: str, session_id: Optional[str],
+                                 intent: IntentResult) -> AsyncIterator[str]:
+        streamed = False
+        try:
+            async for chunk in self.langchain_handler.stream_response(user_input, session_id, intent):
+                streamed = True
+                yield chunk
+            return
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            if streamed:
+                logger.error(f"LangChain stream failed part way through: {e}")
+                return
+            logger.warning(f"LangChain handler failed: {e}, falling back to direct Ollama API")
+
+        try:
+            messages = self._build_messages(user_input, "")
+            async with self.admission.slot():
+                async for chunk in self.client.stream_chat(self.model, messages):
+                    streamed = True
+                    yield chunk
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Connection error with Ollama API: {e}")
+            if not streamed:
+                yield "I apologize, but I'm having trouble connecting to my language model. Please try again in a moment."
+
+    def _is_quote_request(self, intent: IntentResult) -> bool:
         """Check if the query is about pricing or quotes"""
-        quote_keywords = ['quote', 'price', 'cost', 'charges', 'pricing', 'package', 'rates']
-        return any(keyword in query.lower() for keyword in quote_keywords)
+        return intent.has("quote")
 
-    def _handle_quote_request(self, query: str) -> str:
+    def _handle_quote_request(self, intent: IntentResult) -> str:
         """Handle pricing and quote requests"""
         response_parts = []
         
-        if 'website' in query.lower():
+        if 'website' in intent.keywords:
             response_parts.extend([
                 "Thank you for your interest in our website development services. Here are our website packages:",
                 "",
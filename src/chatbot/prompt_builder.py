@@ -0,0 +1,139 @@
+import logging
+from typing import Callable, List, Optional
+
+from utils.tracing import current_trace, registry
+
+logger = logging.getLogger(__name__)
+
+ROLE_LABELS = {"human": "Human", "ai": "Assistant"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: LLaMA-family tokenizers average about 4 characters per token"""
+    return (len(text) + 3) // 4
+
+
+def format_turns(messages: list) -> List[str]:
+    """Format memory messages as one text block per exchange"""
+    turns = []
+    for message in messages:
+        line = f"{ROLE_LABELS.get(message.type, message.type)}: {message.content}"
+        if message.type == "human" or not turns:
+            turns.append(line)
+        else:
+            turns[-1] += "\n" + line
+    return turns
+
+
+class BuiltPrompt:
+    """Chain inputs that fit the budget, with the numbers behind them"""
+
+    def __init__(self, inputs: dict, tokens: int, history_turns: int, dropped_turns: int,
+                 context_truncated: bool):
+        self.inputs = inputs
+        self.tokens = tokens
+        self.history_turns = history_turns
+        self.dropped_turns = dropped_turns
+        self.context_truncated = context_truncated
+
+
+class PromptBuilder:
+    """Fits instructions, retrieved context and history into a token budget.
+
+    The instructions and the user's message are always sent. The running
+    summary of earlier turns, if any, is capped at ``summary_max_tokens``,
+    keeping its newest lines, so a long summary cannot crowd out the
+    retrieved context. Context is capped at ``context_max_tokens``, and
+    history fills whatever is left, newest turn first, so the oldest turns
+    are the ones dropped. ``budget`` is the
+    model's context window and ``response_reserve`` is kept free for the
+    answer. Pass an exact ``count_tokens`` to replace the estimate.
+    """
+
+    def __init__(self, template: str, budget: int = 2048, response_reserve: int = 384,
+                 context_max_tokens: int = 600, summary_max_tokens: int = 300,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.template = template
+        self.budget = budget
+        self.response_reserve = response_reserve
+        self.context_max_tokens = context_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.count_tokens = count_tokens or estimate_tokens
+        self.instruction_tokens = self.count_tokens(template.format(history="", context="", input=""))
+
+    def build(self, user_input: str, context: str, messages: list, summary: str = "") -> BuiltPrompt:
+        available = self.budget - self.response_reserve - self.instruction_tokens
+        available -= self.count_tokens(user_input)
+
+        # The running summary stands in for turns already folded out of memory
+        summary_block = ""
+        if summary:
+            heading = "Summary of earlier conversation:\n"
+            summary_limit = max(0, min(self.summary_max_tokens, available) - self.count_tokens(heading))
+            fitted_summary = self._truncate(summary, summary_limit, keep_end=True)
+            summary_block = heading + fitted_summary if fitted_summary else ""
+        available -= self.count_tokens(summary_block)
+
+        context_limit = max(0, min(self.context_max_tokens, available))
+        fitted_context = self._truncate(context, context_limit)
+        available -= self.count_tokens(fitted_context)
+
+        turns = format_turns(messages)
+        kept = []
+        for turn in reversed(turns):
+            cost = self.count_tokens(turn) + 1  # joining newline
+            if cost > available:
+                break
+            kept.append(turn)
+            available -= cost
+        kept.reverse()
+
+        history = "\n".join([summary_block] + kept if summary_block else kept)
+        inputs = {"input": user_input, "context": fitted_context, "history": history}
+        built = BuiltPrompt(
+            inputs,
+            tokens=self.budget - self.response_reserve - available,
+            history_turns=len(kept),
+            dropped_turns=len(turns) - len(kept),
+            context_truncated=fitted_context != context
+        )
+        self._report(built)
+        return built
+
+    def _truncate(self, text: str, max_tokens: int, keep_end: bool = False) -> str:
+        """Keep whole lines from the top; retrieval puts the best hits first.
+
+        With ``keep_end`` the lines are kept from the bottom instead, as the
+        summary's newest lines are its last.
+        """
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        lines = text.split("\n")
+        if keep_end:
+            lines.reverse()
+        kept = []
+        used = 0
+        for line in lines:
+            cost = self.count_tokens(line) + 1
+            if used + cost > max_tokens:
+                if not kept:
+                    # Even the first line is too long; cut it by the estimate's ratio
+                    cut = max(0, max_tokens * 4)
+                    kept.append(line[len(line) - cut:] if keep_end and cut else line[:cut])
+                break
+            kept.append(line)
+            used += cost
+        if keep_end:
+            kept.reverse()
+        return "\n".join(kept)
+
+    def _report(self, built: BuiltPrompt):
+        registry.observe_value("prompt_tokens", built.tokens)
+        trace = current_trace()
+        if trace is not None:
+            trace.fields.update({"prompt_tokens": built.tokens, "history_turns": built.history_turns})
+        if built.dropped_turns or built.context_truncated:
+            logger.debug(f"Prompt fitted to {built.tokens} tokens: dropped {built.dropped_turns} "
+                         f"turns, context truncated: {built.context_truncated}")
+        else:
+            logger.debug(f"Prompt is {built.tokens} tokens with {built.history_turns} history turns")
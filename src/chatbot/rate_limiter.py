@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Per-process counters; each worker enforces its own budget.
+
+    Keys are kept in order of last use and the least recently used are
+    evicted past ``max_keys``, so memory stays bounded even when every key
+    is still inside its window.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, List[int]]" = OrderedDict()
+
+    def record(self, key: str, window_index: int) -> Tuple[int, int]:
+        """Count one request and return (previous, current) window counts"""
+        counter = self._counters.get(key)
+        if counter is None:
+            while len(self._counters) >= self.max_keys:
+                self._counters.popitem(last=False)
+            counter = self._counters[key] = [window_index, 0, 0]
+        else:
+            self._counters.move_to_end(key)
+            if counter[0] == window_index - 1:
+                counter[:] = [window_index, 0, counter[1]]
+            elif counter[0] != window_index:
+                counter[:] = [window_index, 0, 0]
+        counter[1] += 1
+        return counter[2], counter[1]
+
+
+class SQLiteBackend:
+    """Counters in a SQLite file shared by every worker on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Counters are disposable, so skip fsyncs entirely
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("PRAGMA busy_timeout=2000")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            window_index INTEGER NOT NULL,
+            current INTEGER NOT NULL,
+            previous INTEGER NOT NULL
+        )""")
+
+    def record(self, key: str, window_index: int) -> Tuple[int, int]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # SET expressions see the old row, so one statement rolls the window
+                self._conn.execute("""
+                    INSERT INTO rate_limits (key, window_index, current, previous)
+                    VALUES (?, ?, 1, 0)
+                    ON CONFLICT(key) DO UPDATE SET
+                        previous = CASE
+                            WHEN window_index = excluded.window_index THEN previous
+                            WHEN window_index = excluded.window_index - 1 THEN current
+                            ELSE 0 END,
+                        current = CASE
+                            WHEN window_index = excluded.window_index THEN current + 1
+                            ELSE 1 END,
+                        window_index = excluded.window_index
+                """, (key, window_index))
+                current, previous = self._conn.execute(
+                    "SELECT current, previous FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return previous, current
+
+
+class RateLimiter:
+    """Sliding-window counter limiter, O(1) per check.
+
+    Each key keeps only the counts of the current and previous fixed
+    windows. The request rate is estimated by weighting the previous count
+    by how much of it still overlaps the sliding window. Every attempt is
+    counted, rejected ones included, so a client hammering the endpoint
+    stays limited until it slows down.
+    """
+
+    def __init__(self, limit: int, window: float, backend=None):
+        self.limit = limit
+        self.window = window
+        self.backend = backend or MemoryBackend()
+        self.rejected = 0
+
+    def _estimate(self, key: str, now: float) -> float:
+        window_index = int(now // self.window)
+        previous, current = self.backend.record(key, window_index)
+        overlap = 1 - (now % self.window) / self.window
+        return previous * overlap + current
+
+    def hit(self, keys: Iterable[str]) -> bool:
+        """Count a request against every key; allowed only if all are within the limit"""
+        now = time.time()
+        allowed = all([self._estimate(key, now) <= self.limit for key in keys])
+        if not allowed:
+            self.rejected += 1
+        return allowed
+
+    async def ahit(self, keys: Iterable[str]) -> bool:
+        if isinstance(self.backend, MemoryBackend):
+            return self.hit(keys)
+        return await asyncio.to_thread(self.hit, list(keys))
+
+
+def create_rate_limiter(limit: int, window: float, backend: str = "memory",
+                        path: str = "rate_limits.db") -> RateLimiter:
+    if backend == "sqlite":
+        logger.info(f"Using shared SQLite rate limit store at {path}")
+        return RateLimiter(limit, window, SQLiteBackend(path))
+    if backend == "memory":
+        return RateLimiter(limit, window, MemoryBackend())
+    raise ValueError(f"Unknown rate limit backend {backend!r}; use 'memory' or 'sqlite'")
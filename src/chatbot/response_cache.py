@@ -0,0 +1,172 @@
+import hashlib
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .retrieval import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the similarity histogram used to tune the threshold
+SIMILARITY_BUCKETS = (0.5, 0.8, 0.9, 0.95, 0.98, 1.0)
+
+
+class CacheEntry:
+    def __init__(self, vector: Optional[np.ndarray], query_key: str, context_key: str,
+                 response: str, expires_at: float):
+        self.vector = vector
+        self.query_key = query_key
+        self.context_key = context_key
+        self.response = response
+        self.expires_at = expires_at
+
+
+class SemanticResponseCache:
+    """Reuses LLM responses for near-identical questions.
+
+    An entry matches when the retrieved context is identical and the cosine
+    similarity between query embeddings is at least ``threshold``. The same
+    question asked again, after normalizing case and whitespace, matches
+    without an embedding, which covers lexical fast-path answers. Entries
+    expire after ``ttl`` seconds, the least recently used are evicted past
+    ``max_entries``, and the whole cache is dropped when the knowledge base
+    version changes. The key covers nothing else in the prompt, so callers
+    must only use it for prompts without per-session history.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 3600,
+                 max_entries: int = 512, version: str = ""):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = version
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._exact: Dict[Tuple[str, str], int] = {}
+        self._ids = itertools.count()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.similarity_histogram = [0] * len(SIMILARITY_BUCKETS)
+
+    @staticmethod
+    def context_key(context: str) -> str:
+        return hashlib.sha1(context.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def query_key(query: str) -> str:
+        return EmbeddingCache.normalize(query)
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def set_version(self, version: str):
+        """Drop every entry if the knowledge base changed"""
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def clear(self):
+        self._entries.clear()
+        self._exact.clear()
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        exact_key = (entry.query_key, entry.context_key)
+        if self._exact.get(exact_key) == entry_id:
+            del self._exact[exact_key]
+
+    def lookup(self, embedding: Optional[List[float]], context: str,
+               query: Optional[str] = None) -> Optional[str]:
+        """Return a cached response for the same or a similar query with the same context.
+
+        Without an ``embedding`` only an exact repeat of ``query`` can match.
+        """
+        now = time.monotonic()
+        key = self.context_key(context)
+
+        if query is not None:
+            entry_id = self._exact.get((self.query_key(query), key))
+            if entry_id is not None:
+                if self._entries[entry_id].expires_at > now:
+                    self.hits += 1
+                    self._entries.move_to_end(entry_id)
+                    logger.debug("Response cache hit (same question)")
+                    return self._entries[entry_id].response
+                self._remove(entry_id)
+        if embedding is None:
+            self.misses += 1
+            return None
+
+        vector = self._normalize(embedding)
+        best_id, best_score = None, -1.0
+        for entry_id, entry in list(self._entries.items()):
+            if entry.expires_at <= now:
+                self._remove(entry_id)
+                continue
+            if entry.context_key != key or entry.vector is None or entry.vector.shape != vector.shape:
+                continue
+            score = float(np.dot(entry.vector, vector))
+            if score > best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is not None:
+            self._record_similarity(best_score)
+        if best_id is None or best_score < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_id)
+        logger.debug(f"Response cache hit (similarity {best_score:.3f})")
+        return self._entries[best_id].response
+
+    def store(self, embedding: Optional[List[float]], context: str, response: str,
+              version: Optional[str] = None, query: str = ""):
+        """Cache a response; skipped if it was generated against a knowledge base ``version`` since replaced"""
+        if version is not None and version != self.version:
+            logger.debug("Not caching a response generated against a replaced knowledge base")
+            return
+        if embedding is None and not query:
+            return
+        entry = CacheEntry(
+            self._normalize(embedding) if embedding is not None else None,
+            self.query_key(query),
+            self.context_key(context),
+            response,
+            time.monotonic() + self.ttl
+        )
+        entry_id = next(self._ids)
+        self._entries[entry_id] = entry
+        if query:
+            self._exact[(entry.query_key, entry.context_key)] = entry_id
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _record_similarity(self, score: float):
+        for i, bound in enumerate(SIMILARITY_BUCKETS):
+            if score <= bound:
+                self.similarity_histogram[i] += 1
+                return
+        self.similarity_histogram[-1] += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "best_similarity": dict(zip(SIMILARITY_BUCKETS, self.similarity_histogram))
+        }
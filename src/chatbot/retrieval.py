@@ -0,0 +1,206 @@
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+from utils.tracing import span
+from .lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """LRU cache of query embeddings keyed on normalized query text.
+
+    Most traffic repeats the same few questions, so a hit saves the whole
+    embedding round-trip to Ollama. Hit and miss counters are kept so the
+    cache size can be tuned.
+    """
+
+    def __init__(self, embeddings, max_size: int = 1024):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def _lookup(self, key: str):
+        vector = self._cache.get(key)
+        if vector is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cache.move_to_end(key)
+        return vector
+
+    def _store(self, key: str, vector: List[float]):
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def peek(self, text: str) -> Optional[List[float]]:
+        """Cached vector for text, if any, without fetching or counting a lookup"""
+        return self._cache.get(self.normalize(text))
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.normalize(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(key)
+            self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self.normalize(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(key)
+            self._store(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class RetrievalResult:
+    """Documents retrieved for one query, shared by every step of a turn"""
+
+    def __init__(self, query: str, embedding: Optional[List[float]], documents: list, mode: str = "dense"):
+        self.query = query
+        # None when the lexical fast path answered without embedding the query
+        self.embedding = embedding
+        self.documents = documents
+        self.mode = mode
+
+    @property
+    def context(self) -> str:
+        return "\n".join(doc.page_content for doc in self.documents)
+
+
+class Retriever:
+    """Embeds a query once and runs the vector search with the cached vector"""
+
+    def __init__(self, vector_store, embedding_cache: EmbeddingCache, k: int = 2):
+        self.vector_store = vector_store
+        self.embedding_cache = embedding_cache
+        self.k = k
+
+    def retrieve(self, query: str, k: Optional[int] = None) -> RetrievalResult:
+        with span("retrieval.embed"):
+            embedding = self.embedding_cache.embed_query(query)
+        return self._search(query, embedding, k or self.k)
+
+    async def aretrieve(self, query: str, k: Optional[int] = None) -> RetrievalResult:
+        with span("retrieval.embed"):
+            embedding = await self.embedding_cache.aembed_query(query)
+        return self._search(query, embedding, k or self.k)
+
+    def _search(self, query: str, embedding: List[float], k: int) -> RetrievalResult:
+        with span("retrieval.search"):
+            documents = self.vector_store.similarity_search_by_vector(embedding, k=k)
+        logger.debug(f"Retrieved {len(documents)} documents, embedding cache {self.embedding_cache.stats()}")
+        return RetrievalResult(query, embedding, documents)
+
+
+class HybridRetriever(Retriever):
+    """BM25 and vector search merged with reciprocal rank fusion.
+
+    Queries that name a document outright, or that are just a few terms
+    the lexical index knows, are answered from BM25 alone and never wait
+    on the embedding round-trip. Everything else embeds the query, takes
+    ``candidates`` hits from each side and fuses the two rankings.
+    """
+
+    def __init__(self, vector_store, embedding_cache: EmbeddingCache, documents: Sequence,
+                 k: int = 2, candidates: int = 8, fast_path_max_terms: int = 3):
+        super().__init__(vector_store, embedding_cache, k)
+        self.candidates = candidates
+        self.fast_path_max_terms = fast_path_max_terms
+        self.lexical_count = 0
+        self.hybrid_count = 0
+        self.set_documents(documents)
+
+    def set_documents(self, documents: Sequence):
+        """Rebuild the lexical index over the documents held by the vector store"""
+        self.documents = list(documents)
+        self.lexical = BM25Index(
+            [doc.page_content for doc in self.documents],
+            [doc.metadata.get("name", "") for doc in self.documents]
+        )
+        self._positions = {document_key(doc): i for i, doc in enumerate(self.documents)}
+
+    def retrieve(self, query: str, k: Optional[int] = None) -> RetrievalResult:
+        with span("retrieval.lexical"):
+            ranking = self._lexical_ranking(query)
+        if ranking is not None:
+            return self._lexical_result(query, ranking, k or self.k)
+        with span("retrieval.embed"):
+            embedding = self.embedding_cache.embed_query(query)
+        return self._search(query, embedding, k or self.k)
+
+    async def aretrieve(self, query: str, k: Optional[int] = None) -> RetrievalResult:
+        with span("retrieval.lexical"):
+            ranking = self._lexical_ranking(query)
+        if ranking is not None:
+            return self._lexical_result(query, ranking, k or self.k)
+        with span("retrieval.embed"):
+            embedding = await self.embedding_cache.aembed_query(query)
+        return self._search(query, embedding, k or self.k)
+
+    def _lexical_ranking(self, query: str) -> Optional[List[int]]:
+        """Ranking for the fast path, or None when the query needs the vector search"""
+        named = self.lexical.name_matches(query)
+        if named:
+            ranked = [doc_id for doc_id, _ in self.lexical.search(query, self.candidates)]
+            return named + [doc_id for doc_id in ranked if doc_id not in named]
+        terms = tokenize(query)
+        if 0 < len(terms) <= self.fast_path_max_terms and all(term in self.lexical for term in terms):
+            return [doc_id for doc_id, _ in self.lexical.search(query, self.candidates)]
+        return None
+
+    def _lexical_result(self, query: str, ranking: List[int], k: int) -> RetrievalResult:
+        self.lexical_count += 1
+        documents = [self.documents[doc_id] for doc_id in ranking[:k]]
+        # Reuse a vector embedded earlier so near-duplicate questions can still hit the response cache
+        return RetrievalResult(query, self.embedding_cache.peek(query), documents, mode="lexical")
+
+    def _search(self, query: str, embedding: List[float], k: int) -> RetrievalResult:
+        self.hybrid_count += 1
+        candidates = max(self.candidates, k)
+        with span("retrieval.search"):
+            dense = self.vector_store.similarity_search_by_vector(embedding, k=candidates)
+            dense_ranking = [self._positions[document_key(doc)] for doc in dense
+                             if document_key(doc) in self._positions]
+            lexical_ranking = [doc_id for doc_id, _ in self.lexical.search(query, candidates)]
+            fused = reciprocal_rank_fusion([dense_ranking, lexical_ranking])[:k]
+        documents = [self.documents[doc_id] for doc_id in fused]
+        logger.debug(f"Retrieved {len(documents)} documents, embedding cache {self.embedding_cache.stats()}")
+        return RetrievalResult(query, embedding, documents, mode="hybrid")
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self.documents),
+            "lexical_only": self.lexical_count,
+            "hybrid": self.hybrid_count
+        }
+
+
+def document_key(doc) -> str:
+    """Identity of a stored chunk: its chunk id, or its text for documents indexed without one"""
+    return doc.metadata.get("chunk_id") or doc.page_content
+
+
+def stored_documents(vector_store) -> list:
+    """Documents of a LangChain FAISS store, in index order"""
+    return [vector_store.docstore.search(doc_id)
+            for _, doc_id in sorted(vector_store.index_to_docstore_id.items())]
@@ -0,0 +1,129 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain.memory import ConversationBufferMemory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_ID = "default"
+
+
+def new_conversation_state() -> dict:
+    return {
+        "collecting_contact": False,
+        "name": None,
+        "email": None,
+        "phone": None,
+        "interest": None,
+        "last_response": None,
+        "price_discussed": False,
+        "greeting_shown": False
+    }
+
+
+class ConversationSession:
+    """Memory and lead-collection state for one visitor's chat session"""
+
+    def __init__(self, turn_window: int, max_chars: int):
+        self.turn_window = turn_window
+        self.max_chars = max_chars
+        self.memory = ConversationBufferMemory(
+            memory_key="history",
+            input_key="input",
+            return_messages=True
+        )
+        self.state = new_conversation_state()
+        self.last_access = time.monotonic()
+        # Running summary of turns folded out of memory, and how many it covers
+        self.summary = ""
+        self.summarized_turns = 0
+        self.folding = False
+        self.restored = False
+
+    @property
+    def messages(self) -> list:
+        return self.memory.chat_memory.messages
+
+    def size(self) -> int:
+        """Approximate memory held by this session, in characters"""
+        return sum(len(message.content) for message in self.messages)
+
+    def record_turn(self, user_input: str, response: str):
+        """Store a completed exchange and trim history to the configured bounds"""
+        self.memory.save_context({"input": user_input}, {"text": response})
+        messages = self.messages
+        # Keep at most turn_window exchanges (a human and an AI message each)
+        excess = len(messages) - 2 * self.turn_window
+        if excess > 0:
+            del messages[:excess]
+        # Then drop whole turns from the front until under the character cap
+        while len(messages) > 2 and self.size() > self.max_chars:
+            del messages[:2]
+
+    def turns_to_fold(self, trigger_turns: int, keep_turns: int) -> Optional[List]:
+        """Messages of the oldest turns to summarize once history passes trigger_turns"""
+        if self.folding or len(self.messages) <= 2 * trigger_turns:
+            return None
+        return list(self.messages[:len(self.messages) - 2 * keep_turns])
+
+    def apply_summary(self, summary: str, folded: List):
+        """Replace folded messages with the summary, leaving any newer turns alone"""
+        folded_ids = {id(message) for message in folded}
+        self.messages[:] = [m for m in self.messages if id(m) not in folded_ids]
+        self.summary = summary
+        self.summarized_turns += len(folded) // 2
+
+
+class SessionStore:
+    """Per-session conversation memory with LRU and idle-time eviction.
+
+    Sessions are keyed by the chat_session_id kept in the Quart session.
+    The number of live sessions is capped, and each session's history is
+    bounded both in turns and in characters, so memory use and prompt size
+    stay flat however long the process runs.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 3600,
+                 turn_window: int = 10, max_session_chars: int = 20000):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.turn_window = turn_window
+        self.max_session_chars = max_session_chars
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: Optional[str]) -> ConversationSession:
+        """Return the session for session_id, creating it if needed"""
+        key = session_id or DEFAULT_SESSION_ID
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        conversation = self._sessions.get(key)
+        if conversation is None:
+            conversation = ConversationSession(self.turn_window, self.max_session_chars)
+            self._sessions[key] = conversation
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                logger.debug(f"Evicted least recently used conversation {evicted}")
+        else:
+            self._sessions.move_to_end(key)
+
+        conversation.last_access = now
+        return conversation
+
+    def reset(self, session_id: Optional[str]):
+        """Forget everything stored for a session"""
+        self._sessions.pop(session_id or DEFAULT_SESSION_ID, None)
+
+    def _evict_expired(self, now: float):
+        # Entries are in access order, so expired ones are always at the front
+        while self._sessions:
+            key, conversation = next(iter(self._sessions.items()))
+            if now - conversation.last_access < self.ttl:
+                break
+            del self._sessions[key]
+            logger.debug(f"Evicted idle conversation {key}")
@@ -1,7 +1,68 @@
 from typing import List, Dict
 from datetime import datetime
+import logging
+import re
+
+from .admission import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+FOLD_PROMPT = """Update the running summary of a sales chat between a visitor and Bito, Bitlogicx's assistant.
+Keep the visitor's name, contact details, business, needs, budget and anything promised to them.
+Drop greetings and small talk. Reply with the updated summary only, in at most {max_words} words.
+
+Current summary:
+{summary}
+
+New exchanges:
+{turns}
+
+Updated summary:"""
 
 class ConversationSummarizer:
+    def __init__(self, llm=None, max_chars: int = 1500, admission=None):
+        self.llm = llm
+        self.max_chars = max_chars
+        # Shared with chat generations; folds only use a slot that is free right away
+        self.admission = admission
+
+    async def fold(self, summary: str, turns: List[str]) -> str:
+        """Fold older exchanges into the running summary, with the LLM when a slot is free"""
+        if self.llm is not None:
+            try:
+                prompt = FOLD_PROMPT.format(
+                    max_words=self.max_chars // 6,
+                    summary=summary or "(none yet)",
+                    turns="\n".join(turns)
+                )
+                folded = (await self._invoke(prompt)).strip()
+                if folded:
+                    return folded[:self.max_chars]
+            except AdmissionRejected:
+                logger.debug("LLM busy, using extractive summary")
+            except Exception as e:
+                logger.warning(f"LLM summary failed, using extractive summary: {e}")
+        return self.extractive_fold(summary, turns)
+
+    async def _invoke(self, prompt: str) -> str:
+        if self.admission is None:
+            return await self.llm.ainvoke(prompt)
+        async with self.admission.slot(wait=False):
+            return await self.llm.ainvoke(prompt)
+
+    def extractive_fold(self, summary: str, turns: List[str]) -> str:
+        """Keep the first sentence of each visitor message, oldest lines dropped past max_chars"""
+        lines = summary.split("\n") if summary else []
+        for turn in turns:
+            for line in turn.split("\n"):
+                if line.startswith("Human: "):
+                    sentence = re.split(r"(?<=[.!?])\s", line[len("Human: "):].strip(), maxsplit=1)[0]
+                    if sentence:
+                        lines.append(f"- Visitor: {sentence[:160]}")
+        while len(lines) > 1 and sum(len(line) + 1 for line in lines) > self.max_chars:
+            lines.pop(0)
+        return "\n".join(lines)
+
     def summarize(self, messages: List[Dict]) -> str:
         """Generate conversation summary"""
         if not messages:
@@ -0,0 +1,118 @@
+import logging
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_MODES = ("flat", "ivf", "hnsw", "pq")
+
+# FAISS wants about this many training points per centroid
+POINTS_PER_CENTROID = 39
+
+
+class IndexSettings:
+    """How the vector index is built and searched.
+
+    ``flat`` is exact search over float32 vectors. ``ivf`` clusters the
+    vectors into ``nlist`` lists and searches the ``nprobe`` nearest.
+    ``hnsw`` is a graph index searched with beam width ``ef_search``.
+    ``pq`` is IVF with product-quantized codes of ``pq_m`` sub-vectors at
+    ``pq_bits`` bits each, storing a few dozen bytes per vector instead of
+    4 per dimension. nprobe and ef_search apply at query time and can be
+    changed without a rebuild; everything else is part of the index.
+    """
+
+    def __init__(self, mode: str = "flat", nlist: int = 0, nprobe: int = 8, hnsw_m: int = 32,
+                 ef_construction: int = 80, ef_search: int = 64, pq_m: int = 16, pq_bits: int = 8):
+        if mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode {mode!r}, expected one of {', '.join(INDEX_MODES)}")
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.pq_m = pq_m
+        self.pq_bits = pq_bits
+
+    def key(self) -> str:
+        """Build parameters, folded into the index fingerprint"""
+        if self.mode == "ivf":
+            return f"ivf:{self.nlist}"
+        if self.mode == "hnsw":
+            return f"hnsw:{self.hnsw_m}:{self.ef_construction}"
+        if self.mode == "pq":
+            return f"pq:{self.nlist}:{self.pq_m}:{self.pq_bits}"
+        return "flat"
+
+
+def choose_nlist(count: int, requested: int = 0) -> int:
+    """The requested list count, or about 4 * sqrt(n) capped by the training data available"""
+    nlist = requested or int(4 * math.sqrt(count))
+    return max(1, min(nlist, count // POINTS_PER_CENTROID))
+
+
+def _pq_subvectors(dim: int, requested: int) -> int:
+    """Largest sub-vector count up to requested that divides the dimension"""
+    return next(m for m in range(min(requested, dim), 0, -1) if dim % m == 0)
+
+
+def build_index(vectors: np.ndarray, settings: IndexSettings) -> faiss.Index:
+    """Build, train and fill an index in the configured mode.
+
+    Trained modes fall back to an exact flat index when there are too few
+    vectors to train on, which is the case for a small knowledge base.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    mode = settings.mode
+
+    if mode in ("ivf", "pq"):
+        nlist = choose_nlist(count, settings.nlist)
+        # Each PQ sub-quantizer is a k-means of 2 ** pq_bits centroids as well
+        clusters = max(nlist, 2 ** settings.pq_bits) if mode == "pq" else nlist
+        needed = POINTS_PER_CENTROID * clusters
+        if count < needed:
+            logger.info(f"{count} vectors are too few to train a {mode} index (need {needed}), using flat")
+            mode = "flat"
+
+    if mode == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif mode == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, settings.hnsw_m)
+        index.hnsw.efConstruction = settings.ef_construction
+    elif mode == "ivf":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+    else:
+        index = faiss.IndexIVFPQ(
+            faiss.IndexFlatL2(dim), dim, nlist, _pq_subvectors(dim, settings.pq_m), settings.pq_bits
+        )
+
+    if not index.is_trained:
+        logger.info(f"Training {mode} index with {nlist} lists on {count} vectors")
+        index.train(vectors)
+    index.add(vectors)
+    tune_index(index, settings)
+    return index
+
+
+def tune_index(index: faiss.Index, settings: IndexSettings):
+    """Apply the query-time knobs; run on load too, so changing them needs no rebuild"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(settings.nprobe, ivf.nlist)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.ef_search
+
+
+def stored_vectors(index: faiss.Index) -> Optional[np.ndarray]:
+    """The exact vectors held by the index, or None when it only keeps compressed codes"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        if not isinstance(ivf, faiss.IndexIVFFlat):
+            return None
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
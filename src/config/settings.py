@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,7 +9,96 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your_secret_key'
     DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///insurance_chatbot.db')
     API_KEY = os.environ.get('API_KEY') or 'your_api_key'
+    # Key-protected endpoints stay disabled until API_KEY is set explicitly
+    API_KEY_CONFIGURED = bool(os.environ.get('API_KEY'))
     DEBUG = os.environ.get('DEBUG', 'False').lower() in ('true', '1', 't')
+    # Directory where built FAISS indexes are cached between restarts
+    INDEX_CACHE_DIR = os.getenv(
+        'INDEX_CACHE_DIR',
+        str(Path(__file__).parent.parent / 'knowledge_base' / '.index')
+    )
+    OLLAMA_API_URL = os.getenv('OLLAMA_API_URL', 'http://localhost:11434/api/chat')
+    # Base URL for the LangChain LLM and embedding clients
+    OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+    OLLAMA_MAX_CONNECTIONS = int(os.getenv('OLLAMA_MAX_CONNECTIONS', '10'))
+    OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '5'))
+    OLLAMA_REQUEST_TIMEOUT = float(os.getenv('OLLAMA_REQUEST_TIMEOUT', '30'))
+    # Admission control for LLM generations
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '2'))
+    LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '16'))
+    LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '15'))
+    # Sliding-window rate limit per chat session and per client IP.
+    # Use the 'sqlite' backend to share one budget between workers.
+    RATE_LIMIT_REQUESTS = int(os.getenv('RATE_LIMIT_REQUESTS', '100'))
+    RATE_LIMIT_WINDOW = float(os.getenv('RATE_LIMIT_WINDOW', '3600'))
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB', 'rate_limits.db')
+    # Also limit per client IP; turn off when the real client address is unknown
+    RATE_LIMIT_BY_IP = os.getenv('RATE_LIMIT_BY_IP', 'True').lower() in ('true', '1', 't')
+    # Reverse proxies in front of the app whose X-Forwarded-For entries are trusted
+    TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+    # Per-visitor conversation memory bounds
+    SESSION_MAX_COUNT = int(os.getenv('SESSION_MAX_COUNT', '1000'))
+    SESSION_TTL = float(os.getenv('SESSION_TTL', '3600'))
+    SESSION_TURN_WINDOW = int(os.getenv('SESSION_TURN_WINDOW', '10'))
+    SESSION_MAX_CHARS = int(os.getenv('SESSION_MAX_CHARS', '20000'))
+    # Query and document embeddings: 'ollama' runs EMBEDDING_MODEL on
+    # EMBEDDING_HOST, 'hashed' is an in-process n-gram vectorizer
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'ollama')
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')
+    EMBEDDING_HOST = os.getenv('EMBEDDING_HOST', OLLAMA_HOST)
+    EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', '384'))
+    EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '1024'))
+    RESPONSE_CACHE_THRESHOLD = float(os.getenv('RESPONSE_CACHE_THRESHOLD', '0.95'))
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '512'))
+    # Rolling summaries: once a session holds more than SUMMARY_TRIGGER_TURNS
+    # exchanges, all but the newest SUMMARY_KEEP_TURNS are folded into a summary
+    SUMMARY_TRIGGER_TURNS = int(os.getenv('SUMMARY_TRIGGER_TURNS', '6'))
+    SUMMARY_KEEP_TURNS = int(os.getenv('SUMMARY_KEEP_TURNS', '2'))
+    SUMMARY_MAX_CHARS = int(os.getenv('SUMMARY_MAX_CHARS', '1500'))
+    SUMMARY_MAX_CONCURRENCY = int(os.getenv('SUMMARY_MAX_CONCURRENCY', '1'))
+    SUMMARY_USE_LLM = os.environ.get('SUMMARY_USE_LLM', 'True').lower() in ('true', '1', 't')
+    # Prompt size limits, in tokens; the budget is the model's context window
+    PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '2048'))
+    PROMPT_RESPONSE_RESERVE = int(os.getenv('PROMPT_RESPONSE_RESERVE', '384'))
+    PROMPT_CONTEXT_MAX_TOKENS = int(os.getenv('PROMPT_CONTEXT_MAX_TOKENS', '600'))
+    PROMPT_SUMMARY_MAX_TOKENS = int(os.getenv('PROMPT_SUMMARY_MAX_TOKENS', '300'))
+    # Knowledge base chunking and retrieval; chunk sizes are in characters
+    CHUNK_MAX_CHARS = int(os.getenv('CHUNK_MAX_CHARS', '800'))
+    CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '100'))
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '32'))
+    RETRIEVAL_K = int(os.getenv('RETRIEVAL_K', '2'))
+    SERVICE_CONTEXT_K = int(os.getenv('SERVICE_CONTEXT_K', '4'))
+    # Vector index: flat (exact), ivf, hnsw or pq (IVF with product quantization).
+    # INDEX_NLIST 0 sizes the IVF lists from the chunk count; INDEX_NPROBE and
+    # INDEX_EF_SEARCH are query-time and take effect without a rebuild.
+    INDEX_MODE = os.getenv('INDEX_MODE', 'flat')
+    INDEX_NLIST = int(os.getenv('INDEX_NLIST', '0'))
+    INDEX_NPROBE = int(os.getenv('INDEX_NPROBE', '8'))
+    INDEX_HNSW_M = int(os.getenv('INDEX_HNSW_M', '32'))
+    INDEX_EF_CONSTRUCTION = int(os.getenv('INDEX_EF_CONSTRUCTION', '80'))
+    INDEX_EF_SEARCH = int(os.getenv('INDEX_EF_SEARCH', '64'))
+    INDEX_PQ_M = int(os.getenv('INDEX_PQ_M', '16'))
+    INDEX_PQ_BITS = int(os.getenv('INDEX_PQ_BITS', '8'))
+    # Seconds between checks of the knowledge base files for changes; 0 disables
+    KB_WATCH_INTERVAL = float(os.getenv('KB_WATCH_INTERVAL', '10'))
+    # Write-behind batching for chat messages
+    MESSAGE_BATCH_SIZE = int(os.getenv('MESSAGE_BATCH_SIZE', '100'))
+    MESSAGE_FLUSH_INTERVAL_MS = int(os.getenv('MESSAGE_FLUSH_INTERVAL_MS', '50'))
+    MESSAGE_QUEUE_SIZE = int(os.getenv('MESSAGE_QUEUE_SIZE', '10000'))
+    # Retries of a failed batch before writing its rows one at a time
+    MESSAGE_FLUSH_RETRIES = int(os.getenv('MESSAGE_FLUSH_RETRIES', '3'))
+    MESSAGE_RETRY_BACKOFF_MS = int(os.getenv('MESSAGE_RETRY_BACKOFF_MS', '100'))
+    # SQLite tuning applied to every connection
+    SQL_ECHO = os.environ.get('SQL_ECHO', 'False').lower() in ('true', '1', 't')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '-65536'))  # negative = KiB
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))
+    # Backoff between attempts when building the handlers at startup fails
+    STARTUP_RETRY_INITIAL = float(os.getenv('STARTUP_RETRY_INITIAL', '1'))
+    STARTUP_RETRY_MAX = float(os.getenv('STARTUP_RETRY_MAX', '60'))
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -25,4 +115,66 @@ config = {
 }
 
 # Export DATABASE_URI directly for easier access
-DATABASE_URI = Config.DATABASE_URI
\ No newline at end of file
+DATABASE_URI = Config.DATABASE_URI
+INDEX_CACHE_DIR = Config.INDEX_CACHE_DIR
+OLLAMA_API_URL = Config.OLLAMA_API_URL
+OLLAMA_HOST = Config.OLLAMA_HOST
+OLLAMA_MAX_CONNECTIONS = Config.OLLAMA_MAX_CONNECTIONS
+OLLAMA_CONNECT_TIMEOUT = Config.OLLAMA_CONNECT_TIMEOUT
+OLLAMA_REQUEST_TIMEOUT = Config.OLLAMA_REQUEST_TIMEOUT
+LLM_MAX_CONCURRENCY = Config.LLM_MAX_CONCURRENCY
+LLM_MAX_QUEUE = Config.LLM_MAX_QUEUE
+LLM_QUEUE_TIMEOUT = Config.LLM_QUEUE_TIMEOUT
+RATE_LIMIT_REQUESTS = Config.RATE_LIMIT_REQUESTS
+RATE_LIMIT_WINDOW = Config.RATE_LIMIT_WINDOW
+RATE_LIMIT_BACKEND = Config.RATE_LIMIT_BACKEND
+RATE_LIMIT_DB = Config.RATE_LIMIT_DB
+RATE_LIMIT_BY_IP = Config.RATE_LIMIT_BY_IP
+TRUSTED_PROXY_HOPS = Config.TRUSTED_PROXY_HOPS
+SESSION_MAX_COUNT = Config.SESSION_MAX_COUNT
+SESSION_TTL = Config.SESSION_TTL
+SESSION_TURN_WINDOW = Config.SESSION_TURN_WINDOW
+SESSION_MAX_CHARS = Config.SESSION_MAX_CHARS
+EMBEDDING_BACKEND = Config.EMBEDDING_BACKEND
+EMBEDDING_MODEL = Config.EMBEDDING_MODEL
+EMBEDDING_HOST = Config.EMBEDDING_HOST
+EMBEDDING_DIM = Config.EMBEDDING_DIM
+EMBEDDING_CACHE_SIZE = Config.EMBEDDING_CACHE_SIZE
+RESPONSE_CACHE_THRESHOLD = Config.RESPONSE_CACHE_THRESHOLD
+RESPONSE_CACHE_TTL = Config.RESPONSE_CACHE_TTL
+RESPONSE_CACHE_SIZE = Config.RESPONSE_CACHE_SIZE
+SUMMARY_TRIGGER_TURNS = Config.SUMMARY_TRIGGER_TURNS
+SUMMARY_KEEP_TURNS = Config.SUMMARY_KEEP_TURNS
+SUMMARY_MAX_CHARS = Config.SUMMARY_MAX_CHARS
+SUMMARY_MAX_CONCURRENCY = Config.SUMMARY_MAX_CONCURRENCY
+SUMMARY_USE_LLM = Config.SUMMARY_USE_LLM
+PROMPT_TOKEN_BUDGET = Config.PROMPT_TOKEN_BUDGET
+PROMPT_RESPONSE_RESERVE = Config.PROMPT_RESPONSE_RESERVE
+PROMPT_CONTEXT_MAX_TOKENS = Config.PROMPT_CONTEXT_MAX_TOKENS
+PROMPT_SUMMARY_MAX_TOKENS = Config.PROMPT_SUMMARY_MAX_TOKENS
+CHUNK_MAX_CHARS = Config.CHUNK_MAX_CHARS
+CHUNK_OVERLAP = Config.CHUNK_OVERLAP
+EMBEDDING_BATCH_SIZE = Config.EMBEDDING_BATCH_SIZE
+RETRIEVAL_K = Config.RETRIEVAL_K
+SERVICE_CONTEXT_K = Config.SERVICE_CONTEXT_K
+INDEX_MODE = Config.INDEX_MODE
+INDEX_NLIST = Config.INDEX_NLIST
+INDEX_NPROBE = Config.INDEX_NPROBE
+INDEX_HNSW_M = Config.INDEX_HNSW_M
+INDEX_EF_CONSTRUCTION = Config.INDEX_EF_CONSTRUCTION
+INDEX_EF_SEARCH = Config.INDEX_EF_SEARCH
+INDEX_PQ_M = Config.INDEX_PQ_M
+INDEX_PQ_BITS = Config.INDEX_PQ_BITS
+KB_WATCH_INTERVAL = Config.KB_WATCH_INTERVAL
+MESSAGE_BATCH_SIZE = Config.MESSAGE_BATCH_SIZE
+MESSAGE_FLUSH_INTERVAL_MS = Config.MESSAGE_FLUSH_INTERVAL_MS
+MESSAGE_QUEUE_SIZE = Config.MESSAGE_QUEUE_SIZE
+MESSAGE_FLUSH_RETRIES = Config.MESSAGE_FLUSH_RETRIES
+MESSAGE_RETRY_BACKOFF_MS = Config.MESSAGE_RETRY_BACKOFF_MS
+SQL_ECHO = Config.SQL_ECHO
+SQLITE_SYNCHRONOUS = Config.SQLITE_SYNCHRONOUS
+SQLITE_MMAP_SIZE = Config.SQLITE_MMAP_SIZE
+SQLITE_CACHE_SIZE = Config.SQLITE_CACHE_SIZE
+SQLITE_BUSY_TIMEOUT = Config.SQLITE_BUSY_TIMEOUT
+STARTUP_RETRY_INITIAL = Config.STARTUP_RETRY_INITIAL
+STARTUP_RETRY_MAX = Config.STARTUP_RETRY_MAX
\ No newline at end of file
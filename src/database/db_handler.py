@@ -1,11 +1,20 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from .models import Base, CompanyInfo, ContactForm, ChatMessage, ChatSession
-from config.settings import DATABASE_URI
+from .models import Base, CompanyInfo, ContactForm, ChatMessage, ChatSession, ConversationSummary
+from .message_writer import ChatMessageWriter
+from .migrations import ensure_indexes
+from .rollups import install_rollups
+from .fulltext import install_fulltext
+from config.settings import (
+    DATABASE_URI, MESSAGE_BATCH_SIZE, MESSAGE_FLUSH_INTERVAL_MS, MESSAGE_QUEUE_SIZE,
+    MESSAGE_FLUSH_RETRIES, MESSAGE_RETRY_BACKOFF_MS,
+    SQL_ECHO, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, SQLITE_BUSY_TIMEOUT
+)
 from datetime import datetime
 import logging
 import aiosqlite
-from sqlalchemy import select
+from sqlalchemy import event, select
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +32,12 @@ class DatabaseHandler:
             try:
                 self.engine = create_async_engine(
                     DATABASE_URI.replace('sqlite:///', 'sqlite+aiosqlite:///'),
-                    echo=True,
+                    echo=SQL_ECHO,
                     pool_pre_ping=True,
                     pool_recycle=3600
                 )
+                if self.engine.dialect.name == 'sqlite':
+                    event.listen(self.engine.sync_engine, 'connect', _apply_sqlite_pragmas)
                 self.async_session = async_sessionmaker(
                     self.engine,
                     class_=AsyncSession,
@@ -34,12 +45,26 @@ class DatabaseHandler:
                 )
                 async with self.engine.begin() as conn:
                     await conn.run_sync(Base.metadata.create_all)
+                    # Older database files predate the indexes on the models
+                    await conn.run_sync(ensure_indexes)
+                    await conn.run_sync(install_rollups)
+                    await conn.run_sync(install_fulltext)
+                self.message_writer = ChatMessageWriter(
+                    self.async_session,
+                    batch_size=MESSAGE_BATCH_SIZE,
+                    flush_interval=MESSAGE_FLUSH_INTERVAL_MS / 1000,
+                    max_queue=MESSAGE_QUEUE_SIZE,
+                    max_retries=MESSAGE_FLUSH_RETRIES,
+                    retry_backoff=MESSAGE_RETRY_BACKOFF_MS / 1000
+                )
+                self.message_writer.start()
                 self._initialized = True
                 logger.info("Database initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize database: {e}")
                 raise
 
+    @traced("db.save_contact_form")
     async def save_contact_form(self, contact_data):
         """Save contact form data using SQLAlchemy models"""
         try:
@@ -118,6 +143,60 @@ class DatabaseHandler:
                 logger.error(f"Error saving chat message: {e}")
                 return False
 
+    @traced("db.queue_message")
+    async def queue_chat_message(self, session_id: str, sender: str, content: str):
+        """Queue a chat message for the background batch writer"""
+        await self.message_writer.enqueue(session_id, sender, content)
+
+    async def close(self):
+        """Flush queued messages and release the connection pool"""
+        if self._initialized:
+            await self.message_writer.stop()
+            await self.engine.dispose()
+            self._initialized = False
+
+    @traced("db.load_summary")
+    async def get_conversation_summary(self, session_id: str):
+        """Get the stored running summary for a chat session, if any"""
+        async with self.async_session() as session:
+            try:
+                return await session.get(ConversationSummary, session_id)
+            except Exception as e:
+                logger.error(f"Error loading conversation summary: {e}")
+                return None
+
+    async def save_conversation_summary(self, session_id: str, summary: str, summarized_turns: int):
+        """Insert or replace the running summary for a chat session"""
+        async with self.async_session() as session:
+            try:
+                await session.merge(ConversationSummary(
+                    session_id=session_id,
+                    summary=summary,
+                    summarized_turns=summarized_turns,
+                    updated_at=datetime.utcnow()
+                ))
+                await session.commit()
+                return True
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error saving conversation summary: {e}")
+                return False
+
+    async def delete_conversation_summary(self, session_id: str):
+        """Forget the running summary when a chat is reset"""
+        async with self.async_session() as session:
+            try:
+                summary = await session.get(ConversationSummary, session_id)
+                if summary:
+                    await session.delete(summary)
+                    await session.commit()
+                return True
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error deleting conversation summary: {e}")
+                return False
+
+    @traced("db.create_session")
     async def create_chat_session(self, user_id: str):
         """Create new chat session"""
         async with self.async_session() as session:
@@ -138,10 +217,9 @@ class DatabaseHandler:
         """Verify if contact form exists"""
         async with self.async_session() as session:
             try:
-                query = select(ContactForm).where(ContactForm.email == email)
+                query = select(ContactForm.id).where(ContactForm.email == email).limit(1)
                 result = await session.execute(query)
-                contact = result.scalar_one_or_none()
-                return contact is not None
+                return result.scalar() is not None
             except Exception as e:
                 logger.error(f"Error verifying contact form: {e}")
                 return False
@@ -150,14 +228,25 @@ class DatabaseHandler:
         """Verify if chat messages exist"""
         async with self.async_session() as session:
             try:
-                query = select(ChatMessage).where(ChatMessage.session_id == session_id)
+                query = select(ChatMessage.id).where(ChatMessage.session_id == session_id).limit(1)
                 result = await session.execute(query)
-                messages = result.scalars().all()
-                return len(messages) > 0
+                return result.scalar() is not None
             except Exception as e:
                 logger.error(f"Error verifying chat messages: {e}")
                 return False
 
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for a write-heavy chat workload"""
+    cursor = dbapi_connection.cursor()
+    # WAL lets the admin panel read while the chatbot writes
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
 def connect_to_db():
     import sqlite3
     from sqlite3 import Error
@@ -0,0 +1,116 @@
+"""SQLite FTS5 indexes over chat transcripts and contact forms.
+
+Both are external-content tables: they store only the inverted index and
+read the text back from chat_messages and contact_forms, so the search
+index adds little to the database size. Triggers keep them in step with
+inserts, updates and deletes. The chatbot and the admin panel both create
+the tables on startup, and databases that already hold rows are indexed
+the first time; to rebuild and compact the index from scratch run:
+
+    python -m database.fulltext ../database.db
+"""
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+FTS_TABLES = ['chat_messages_fts', 'contact_forms_fts']
+
+SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+        content, content='chat_messages', content_rowid='id', tokenize='{TOKENIZER}'
+    )""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS contact_forms_fts USING fts5(
+        name, email, phone, message, content='contact_forms', content_rowid='id', tokenize='{TOKENIZER}'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS trg_fts_chat_message_insert AFTER INSERT ON chat_messages
+    BEGIN
+        INSERT INTO chat_messages_fts (rowid, content) VALUES (NEW.id, NEW.content);
+    END""",
+    # External-content tables must be told the old text to remove it from the index
+    """CREATE TRIGGER IF NOT EXISTS trg_fts_chat_message_delete AFTER DELETE ON chat_messages
+    BEGIN
+        INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_fts_chat_message_update AFTER UPDATE OF content ON chat_messages
+    BEGIN
+        INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+        INSERT INTO chat_messages_fts (rowid, content) VALUES (NEW.id, NEW.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_fts_contact_form_insert AFTER INSERT ON contact_forms
+    BEGIN
+        INSERT INTO contact_forms_fts (rowid, name, email, phone, message)
+            VALUES (NEW.id, NEW.name, NEW.email, NEW.phone, NEW.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_fts_contact_form_delete AFTER DELETE ON contact_forms
+    BEGIN
+        INSERT INTO contact_forms_fts (contact_forms_fts, rowid, name, email, phone, message)
+            VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.phone, OLD.message);
+    END""",
+    # Status changes do not touch the indexed columns, so they skip this
+    """CREATE TRIGGER IF NOT EXISTS trg_fts_contact_form_update
+    AFTER UPDATE OF name, email, phone, message ON contact_forms
+    BEGIN
+        INSERT INTO contact_forms_fts (contact_forms_fts, rowid, name, email, phone, message)
+            VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.phone, OLD.message);
+        INSERT INTO contact_forms_fts (rowid, name, email, phone, message)
+            VALUES (NEW.id, NEW.name, NEW.email, NEW.phone, NEW.message);
+    END""",
+]
+
+REBUILD = [f"INSERT INTO {table} ({table}) VALUES ('rebuild')" for table in FTS_TABLES]
+
+OPTIMIZE = [f"INSERT INTO {table} ({table}) VALUES ('optimize')" for table in FTS_TABLES]
+
+
+def install_fulltext(connection):
+    """Create the search indexes and their triggers, indexing existing rows the first time"""
+    if connection.dialect.name != 'sqlite':
+        return
+    existing = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('chat_messages_fts', 'contact_forms_fts')"
+    ).scalars().all()
+    for statement in SCHEMA:
+        connection.exec_driver_sql(statement)
+    for table, statement in zip(FTS_TABLES, REBUILD):
+        if table not in existing:
+            connection.exec_driver_sql(statement)
+            logger.info(f"Indexed existing rows into {table}")
+
+
+def install_fulltext_sqlite(conn):
+    """install_fulltext for a plain sqlite3 connection, as the admin panel uses"""
+    with conn:
+        existing = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('chat_messages_fts', 'contact_forms_fts')"
+        )]
+        for statement in SCHEMA:
+            conn.execute(statement)
+        for table, statement in zip(FTS_TABLES, REBUILD):
+            if table not in existing:
+                conn.execute(statement)
+                logger.info(f"Indexed existing rows into {table}")
+
+
+def rebuild(connection):
+    """Re-read every row from the content tables and merge the index into one segment"""
+    for statement in REBUILD + OPTIMIZE:
+        connection.exec_driver_sql(statement)
+    logger.info("Full-text indexes rebuilt")
+
+
+if __name__ == '__main__':
+    import sqlite3
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2:
+        print("Usage: python -m database.fulltext <path/to/database.db>")
+        sys.exit(1)
+    conn = sqlite3.connect(sys.argv[1])
+    with conn:
+        for statement in SCHEMA + REBUILD + OPTIMIZE:
+            conn.execute(statement)
+    conn.close()
+    logger.info("Full-text indexes rebuilt")
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from .models import ChatMessage
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ChatMessageWriter:
+    """Write-behind buffer for chat messages.
+
+    Requests enqueue rows and return immediately; a background task collects
+    them into batches of up to ``batch_size`` rows or ``flush_interval``
+    seconds and writes each batch with a single bulk INSERT and commit. The
+    queue is bounded, so when the database falls behind ``enqueue`` waits
+    for space instead of buffering without limit.
+
+    A failed batch is retried ``max_retries`` times with exponential backoff
+    starting at ``retry_backoff`` seconds, which rides out a busy database.
+    If it still fails its rows are written one at a time, so a single bad
+    row only loses itself.
+    """
+
+    def __init__(self, session_factory, batch_size: int = 100,
+                 flush_interval: float = 0.05, max_queue: int = 10000,
+                 max_retries: int = 3, retry_backoff: float = 0.1):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, session_id: str, sender: str, content: str):
+        """Queue a message for writing; waits only if the queue is full"""
+        await self.queue.put({
+            "session_id": session_id,
+            "sender": sender,
+            "content": content,
+            "timestamp": datetime.utcnow()
+        })
+
+    async def stop(self):
+        """Flush everything still queued and stop the writer task"""
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self.queue.get()
+            if row is _STOP:
+                break
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+
+    async def _insert(self, rows: List[dict]):
+        async with self.session_factory() as session:
+            try:
+                await session.execute(insert(ChatMessage), rows)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def _flush(self, batch: List[dict]):
+        with span("db.flush"):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await self._insert(batch)
+                    self.written += len(batch)
+                    logger.debug(f"Flushed {len(batch)} chat messages")
+                    return
+                except Exception as e:
+                    error = e
+                if attempt < self.max_retries:
+                    delay = self.retry_backoff * 2 ** attempt
+                    self.retries += 1
+                    logger.warning(f"Error flushing {len(batch)} chat messages, retrying in {delay:.2f}s: {error}")
+                    await asyncio.sleep(delay)
+
+            if len(batch) == 1:
+                self.failed += 1
+                logger.error(f"Dropping chat message for session {batch[0]['session_id']}: {error}")
+                return
+            logger.error(f"Error flushing {len(batch)} chat messages, writing them one at a time: {error}")
+            for row in batch:
+                try:
+                    await self._insert([row])
+                    self.written += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Dropping chat message for session {row['session_id']}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries
+        }
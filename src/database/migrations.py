@@ -0,0 +1,47 @@
+"""Schema upgrades for databases created by older versions.
+
+``create_all`` only creates indexes together with their table, so
+databases that already have the tables never get indexes added to the
+models later. Run against an existing file with:
+
+    python -m database.migrations ../database.db
+"""
+import logging
+import sys
+
+from sqlalchemy import create_engine, text
+
+from .models import Base
+from .fulltext import install_fulltext
+from .rollups import install_rollups
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_indexes(connection):
+    """Create every index declared in the models that the database lacks"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    if connection.dialect.name == 'sqlite':
+        # Refresh planner statistics so the new indexes are picked up
+        connection.execute(text('PRAGMA optimize'))
+    logger.info("Database indexes are up to date")
+
+
+def migrate(database_path: str):
+    engine = create_engine(f'sqlite:///{database_path}')
+    with engine.begin() as connection:
+        Base.metadata.create_all(connection)
+        ensure_indexes(connection)
+        install_rollups(connection)
+        install_fulltext(connection)
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2:
+        print("Usage: python -m database.migrations <path/to/database.db>")
+        sys.exit(1)
+    migrate(sys.argv[1])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import uuid
@@ -18,10 +18,10 @@ class ContactForm(Base):
     
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)
-    email = Column(String(100), nullable=False)
+    email = Column(String(100), nullable=False, index=True)
     phone = Column(String(20), nullable=False)
     message = Column(Text)
-    submission_date = Column(DateTime, default=datetime.utcnow)
+    submission_date = Column(DateTime, default=datetime.utcnow, index=True)
     status = Column(String(20), default='new')
     session_id = Column(String(36), nullable=True)  # Add this line
 
@@ -30,16 +30,29 @@ class ChatSession(Base):
     
     session_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String(100), nullable=False)
-    start_time = Column(DateTime, nullable=False)
+    # Keyset pagination of the admin panel's session list
+    start_time = Column(DateTime, nullable=False, index=True)
 
 class ChatMessage(Base):
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        # Serves per-session lookups as well as GROUP BY session_id with MIN/MAX(timestamp)
+        Index('ix_chat_messages_session_id_timestamp', 'session_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     session_id = Column(String(36), ForeignKey('chat_sessions.session_id'), nullable=False)
     sender = Column(String(50), nullable=False)  # 'user' or 'bot'
     content = Column(Text, nullable=False)
-    timestamp = Column(DateTime, nullable=False)
+    timestamp = Column(DateTime, nullable=False, index=True)
+
+class ConversationSummary(Base):
+    __tablename__ = 'conversation_summaries'
+
+    session_id = Column(String(36), ForeignKey('chat_sessions.session_id'), primary_key=True)
+    summary = Column(Text, nullable=False)
+    summarized_turns = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 class InsurancePolicy:
     def __init__(self, policy_id, policy_holder_name, insurance_type, start_date, end_date):
@@ -0,0 +1,147 @@
+"""Counters for the admin dashboard, kept current by SQLite triggers.
+
+Every insert into chat_messages, contact_forms or session_activity bumps
+the matching rows of three small tables, in the same transaction as the
+insert itself:
+
+* ``stats_totals``: a single row of all-time message, session and contact counts
+* ``stats_daily``: messages, new sessions and leads per UTC day
+* ``session_activity``: one row per session with its message count and latest message
+
+The dashboard then reads a handful of rows instead of scanning the message
+table. The chatbot and the admin panel both create the rollups when they
+start and backfill them from existing rows the first time, so an older
+database picks them up on its next start. Rows deleted from the base
+tables are not subtracted; run the backfill to recompute everything from
+scratch:
+
+    python -m database.rollups ../database.db
+"""
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS stats_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        messages INTEGER NOT NULL DEFAULT 0,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        contacts INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT PRIMARY KEY,
+        messages INTEGER NOT NULL DEFAULT 0,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        leads INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS session_activity (
+        session_id VARCHAR(36) PRIMARY KEY,
+        first_time DATETIME NOT NULL,
+        last_time DATETIME NOT NULL,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        last_message TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_session_activity_last_time ON session_activity (last_time)",
+    # Assignments in DO UPDATE see the row as it was, so the CASE compares with the old last_time
+    """CREATE TRIGGER IF NOT EXISTS trg_rollup_chat_message AFTER INSERT ON chat_messages
+    BEGIN
+        UPDATE stats_totals SET messages = messages + 1 WHERE id = 1;
+        INSERT INTO stats_daily (day, messages) VALUES (date(NEW.timestamp), 1)
+            ON CONFLICT (day) DO UPDATE SET messages = messages + 1;
+        INSERT INTO session_activity (session_id, first_time, last_time, message_count, last_message)
+            VALUES (NEW.session_id, NEW.timestamp, NEW.timestamp, 1, NEW.content)
+            ON CONFLICT (session_id) DO UPDATE SET
+                message_count = message_count + 1,
+                first_time = min(first_time, excluded.first_time),
+                last_time = max(last_time, excluded.last_time),
+                last_message = CASE WHEN excluded.last_time >= last_time
+                                    THEN excluded.last_message ELSE last_message END;
+    END""",
+    # Fires only for the first message stored for a session; the upsert above updates later ones
+    """CREATE TRIGGER IF NOT EXISTS trg_rollup_session AFTER INSERT ON session_activity
+    BEGIN
+        UPDATE stats_totals SET sessions = sessions + 1 WHERE id = 1;
+        INSERT INTO stats_daily (day, sessions) VALUES (date(NEW.first_time), 1)
+            ON CONFLICT (day) DO UPDATE SET sessions = sessions + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_rollup_contact_form AFTER INSERT ON contact_forms
+    BEGIN
+        UPDATE stats_totals SET contacts = contacts + 1 WHERE id = 1;
+        INSERT INTO stats_daily (day, leads) VALUES (COALESCE(date(NEW.submission_date), date('now')), 1)
+            ON CONFLICT (day) DO UPDATE SET leads = leads + 1;
+    END""",
+]
+
+# Session rows go first: their insert trigger touches the counters, which are rebuilt afterwards
+BACKFILL = [
+    "DELETE FROM session_activity",
+    """INSERT INTO session_activity (session_id, first_time, last_time, message_count, last_message)
+    SELECT m.session_id, MIN(m.timestamp), MAX(m.timestamp), COUNT(*),
+           (SELECT latest.content FROM chat_messages latest
+            WHERE latest.session_id = m.session_id
+            ORDER BY latest.timestamp DESC, latest.id DESC LIMIT 1)
+    FROM chat_messages m
+    GROUP BY m.session_id""",
+    "DELETE FROM stats_daily",
+    """INSERT INTO stats_daily (day, messages, sessions, leads)
+    SELECT day, SUM(messages), SUM(sessions), SUM(leads) FROM (
+        SELECT date(timestamp) AS day, COUNT(*) AS messages, 0 AS sessions, 0 AS leads
+        FROM chat_messages GROUP BY 1
+        UNION ALL
+        SELECT date(first_time), 0, COUNT(*), 0 FROM session_activity GROUP BY 1
+        UNION ALL
+        SELECT COALESCE(date(submission_date), date('now')), 0, 0, COUNT(*) FROM contact_forms GROUP BY 1
+    )
+    GROUP BY day""",
+    "DELETE FROM stats_totals",
+    """INSERT INTO stats_totals (id, messages, sessions, contacts) VALUES (
+        1,
+        (SELECT COUNT(*) FROM chat_messages),
+        (SELECT COUNT(*) FROM session_activity),
+        (SELECT COUNT(*) FROM contact_forms)
+    )""",
+]
+
+
+def install_rollups(connection):
+    """Create the rollup tables and triggers, backfilling them the first time"""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in SCHEMA:
+        connection.exec_driver_sql(statement)
+    if connection.exec_driver_sql("SELECT 1 FROM stats_totals").first() is None:
+        backfill(connection)
+
+
+def install_rollups_sqlite(conn):
+    """install_rollups for a plain sqlite3 connection, as the admin panel uses"""
+    with conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+        if conn.execute("SELECT 1 FROM stats_totals").fetchone() is None:
+            for statement in BACKFILL:
+                conn.execute(statement)
+            logger.info("Dashboard rollups rebuilt from the base tables")
+
+
+def backfill(connection):
+    """Recompute every rollup from the base tables"""
+    for statement in BACKFILL:
+        connection.exec_driver_sql(statement)
+    logger.info("Dashboard rollups rebuilt from the base tables")
+
+
+if __name__ == '__main__':
+    import sqlite3
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2:
+        print("Usage: python -m database.rollups <path/to/database.db>")
+        sys.exit(1)
+    conn = sqlite3.connect(sys.argv[1])
+    with conn:
+        for statement in SCHEMA + BACKFILL:
+            conn.execute(statement)
+    conn.close()
+    logger.info("Dashboard rollups rebuilt from the base tables")
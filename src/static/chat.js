@@ -197,17 +197,7 @@ async function sendMessage() {
         showTypingIndicator();
 
         try {
-            const response = await fetch('/chat', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ message: message }),
-            });
-
-            hideTypingIndicator();
-            const data = await response.json();
-            addMessage(data.response, false);
+            await streamResponse(message);
         } catch (error) {
             hideTypingIndicator();
             console.error('Error:', error);
@@ -216,6 +206,112 @@ async function sendMessage() {
     }
 }
 
+function createStreamingMessage() {
+    const messagesDiv = document.getElementById('chat-messages');
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message bot-message';
+
+    const avatar = document.createElement('img');
+    avatar.className = 'avatar';
+    avatar.src = '/static/images/bot-avatar.png';
+    avatar.alt = 'Bito';
+
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'message-content';
+
+    messageDiv.appendChild(avatar);
+    messageDiv.appendChild(contentDiv);
+    messagesDiv.appendChild(messageDiv);
+    return contentDiv;
+}
+
+async function finishStreamingMessage(contentDiv, text) {
+    contentDiv.innerHTML = await renderMarkdown(text);
+    const timeDiv = document.createElement('div');
+    timeDiv.className = 'message-time';
+    timeDiv.textContent = new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+    contentDiv.appendChild(timeDiv);
+    const messagesDiv = document.getElementById('chat-messages');
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+}
+
+async function streamResponse(message) {
+    // Tokens arrive as Server-Sent Events; show them as plain text while
+    // streaming and render markdown once the full response is known
+    const response = await fetch('/chat/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ message: message }),
+    });
+    if (response.status === 429 || response.status === 503) {
+        const data = await response.json();
+        hideTypingIndicator();
+        addMessage(data.response, false);
+        return;
+    }
+    if (!response.ok || !response.body) {
+        throw new Error(`Stream request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const messagesDiv = document.getElementById('chat-messages');
+    let contentDiv = null;
+    let buffer = '';
+    let text = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            });
+            if (!data) {
+                continue;
+            }
+            const payload = JSON.parse(data);
+
+            if (!contentDiv) {
+                hideTypingIndicator();
+                contentDiv = createStreamingMessage();
+            }
+
+            if (event === 'message') {
+                text += payload.token;
+                contentDiv.textContent = text;
+                messagesDiv.scrollTop = messagesDiv.scrollHeight;
+            } else {
+                // 'done' carries the final text, 'error' a fallback message
+                await finishStreamingMessage(contentDiv, payload.response);
+                return;
+            }
+        }
+    }
+
+    if (!contentDiv) {
+        hideTypingIndicator();
+        contentDiv = createStreamingMessage();
+    }
+    await finishStreamingMessage(contentDiv, text);
+}
+
 document.getElementById('user-input').addEventListener('keypress', function(e) {
     if (e.key === 'Enter') {
         sendMessage();
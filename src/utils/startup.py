@@ -0,0 +1,103 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STARTING = "starting"
+RETRYING = "retrying"
+READY = "ready"
+
+
+class Startup:
+    """Builds the app's heavy components in a background task.
+
+    The server binds and answers health checks straight away while ``build``
+    runs. Each named stage is timed and its result kept, so when a stage
+    fails (Ollama not up yet, say) the build is retried with exponential
+    backoff and resumes from the first stage that has not completed.
+    """
+
+    def __init__(self, initial_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.state = STARTING
+        self.timings: Dict[str, float] = {}
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.ready_after: Optional[float] = None
+        self._results: Dict[str, object] = {}
+        self._started = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def start(self, build: Callable[["Startup"], Awaitable[None]]):
+        self._started = time.monotonic()
+        self._task = asyncio.create_task(self._run(build))
+
+    async def stop(self):
+        """Cancel a build that is still in progress"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def stage(self, name: str, func: Callable, *args, in_thread: bool = False):
+        """Run one startup stage once, recording how long it took"""
+        if name in self._results:
+            return self._results[name]
+        started = time.perf_counter()
+        if in_thread:
+            # Blocking constructors run off the event loop so health checks keep answering
+            result = await asyncio.to_thread(func, *args)
+        else:
+            result = func(*args)
+            if inspect.isawaitable(result):
+                result = await result
+        self.record(name, time.perf_counter() - started)
+        self._results[name] = result
+        return result
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = seconds
+        logger.info(f"Startup stage {name} took {seconds:.2f}s")
+
+    async def _run(self, build):
+        backoff = self.initial_backoff
+        while True:
+            self.attempts += 1
+            try:
+                await build(self)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.state = RETRYING
+                self.error = str(e)
+                logger.error(f"Startup attempt {self.attempts} failed, retrying in {backoff:.1f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            self.state = READY
+            self.error = None
+            self.ready_after = time.monotonic() - self._started
+            logger.info(f"Startup complete in {self.ready_after:.2f}s: " + ", ".join(
+                f"{name} {seconds:.2f}s" for name, seconds in self.timings.items()
+            ))
+            return
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "error": self.error,
+            "uptime_seconds": time.monotonic() - self._started,
+            "ready_after_seconds": self.ready_after,
+            "stages": self.timings
+        }
@@ -0,0 +1,195 @@
+import bisect
+import functools
+import json
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; sized for everything from cache hits to LLM generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Upper bounds for size distributions such as prompt tokens
+SIZE_BUCKETS = (64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the shape Prometheus expects"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterable[Tuple[str, int]]:
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            yield repr(bound), running
+        yield "+Inf", self.count
+
+
+class MetricsRegistry:
+    """In-process store of per-stage latency histograms and size distributions"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[str, Histogram] = {}
+        self.distributions: Dict[str, Histogram] = {}
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def observe_value(self, name: str, value: float, buckets: Tuple[float, ...] = SIZE_BUCKETS):
+        """Record a non-latency measurement, exported as its own chatbot_<name> histogram"""
+        histogram = self.distributions.get(name)
+        if histogram is None:
+            histogram = self.distributions[name] = Histogram(buckets)
+        histogram.observe(value)
+
+    def render(self, gauges: Optional[Dict[str, Dict]] = None) -> str:
+        """Prometheus text exposition of the histograms plus numeric gauges"""
+        lines = [
+            "# HELP chatbot_stage_duration_seconds Time spent in each stage of a request",
+            "# TYPE chatbot_stage_duration_seconds histogram",
+        ]
+        for stage in sorted(self.histograms):
+            histogram = self.histograms[stage]
+            for bound, count in histogram.cumulative():
+                lines.append(f'chatbot_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'chatbot_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'chatbot_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        for name in sorted(self.distributions):
+            histogram = self.distributions[name]
+            metric = f"chatbot_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, count in histogram.cumulative():
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{metric}_sum {histogram.sum}")
+            lines.append(f"{metric}_count {histogram.count}")
+
+        for component, stats in (gauges or {}).items():
+            for key, value in stats.items():
+                # Nested breakdowns and labels are left to /status
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"chatbot_{component}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class Trace:
+    """Per-request collection of span durations"""
+
+    def __init__(self, name: str, **fields):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.fields = fields
+        self.spans: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        # Repeated stages, like the two message writes of a turn, add up
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+class span:
+    """Time a block as a named stage.
+
+    Works with both ``with`` and ``async with``. The duration always goes to
+    the histogram registry and, when a trace is active in the current
+    context, is attached to that trace as well.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0.0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.started
+        registry.observe(self.name, self.seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self.name, self.seconds)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class trace(span):
+    """Root span of a request; logs every stage's duration as one JSON line on exit"""
+
+    def __init__(self, name: str, **fields):
+        super().__init__(name)
+        self.trace = Trace(name, **fields)
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_trace.set(self.trace)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        # Detach first so the root duration is not counted as one of its own stages
+        try:
+            _current_trace.reset(self._token)
+        except ValueError:
+            # Exited from another context, e.g. a generator finished by the server
+            _current_trace.set(None)
+        super().__exit__(exc_type, exc, tb)
+        record = {
+            "trace": self.name,
+            "trace_id": self.trace.trace_id,
+            "total_ms": round(self.seconds * 1000, 2),
+            "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in self.trace.spans.items()},
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(self.trace.fields)
+        logger.info(json.dumps(record))
+        return False
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def traced(name: str, root: bool = False):
+    """Decorator that runs an async function inside a span, or a new trace if root"""
+    timer = trace if root else span
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with timer(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,34 @@
+from chatbot.prompt_builder import PromptBuilder, estimate_tokens
+
+TEMPLATE = "Answer using the context.\n{context}\n{history}\nHuman: {input}\nAssistant:"
+
+
+class Message:
+    def __init__(self, type, content):
+        self.type = type
+        self.content = content
+
+
+def test_oversized_summary_leaves_room_for_context():
+    builder = PromptBuilder(TEMPLATE, budget=1024, response_reserve=256,
+                            context_max_tokens=300, summary_max_tokens=100)
+    summary = "\n".join(f"- Visitor: asked about topic number {i} in some detail" for i in range(200))
+    context = "\n".join(f"Bitlogicx service line {i}" for i in range(40))
+
+    built = builder.build("What do you offer?", context, [], summary=summary)
+
+    assert built.inputs["context"] == context
+    assert not built.context_truncated
+    assert estimate_tokens(built.inputs["history"]) <= 100
+    # The newest summary lines are the ones kept
+    assert built.inputs["history"].endswith("topic number 199 in some detail")
+    assert built.tokens <= builder.budget - builder.response_reserve
+
+
+def test_short_summary_is_sent_whole():
+    builder = PromptBuilder(TEMPLATE, budget=1024, response_reserve=256)
+    built = builder.build("Hi", "context", [Message("human", "Hello"), Message("ai", "Hi there")],
+                          summary="- Visitor: wants an ERP quote")
+    assert built.inputs["history"] == (
+        "Summary of earlier conversation:\n- Visitor: wants an ERP quote\nHuman: Hello\nAssistant: Hi there"
+    )
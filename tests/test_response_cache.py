@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from chatbot.response_cache import SemanticResponseCache  # noqa: E402
+from chatbot.retrieval import EmbeddingCache, HybridRetriever  # noqa: E402
+
+
+class Document:
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class UnusedEmbeddings:
+    """The fast path must not embed anything"""
+
+    def embed_query(self, text):
+        raise AssertionError("fast-path query was embedded")
+
+
+DOCUMENTS = [
+    Document("Bitlogicx builds ERP systems for manufacturing and retail.", {"name": "erp"}),
+    Document("Our mobile team ships Flutter apps for iOS and Android.", {"name": "mobile"}),
+]
+
+
+def test_repeated_fast_path_question_hits_the_cache():
+    retriever = HybridRetriever(None, EmbeddingCache(UnusedEmbeddings()), DOCUMENTS, k=1)
+    cache = SemanticResponseCache()
+
+    first = retriever.retrieve("Flutter apps")
+    assert first.mode == "lexical" and first.embedding is None
+    assert cache.lookup(first.embedding, first.context, query="Flutter apps") is None
+    cache.store(first.embedding, first.context, "We build Flutter apps.", query="Flutter apps")
+
+    again = retriever.retrieve("  flutter   APPS ")
+    assert again.mode == "lexical"
+    assert cache.lookup(again.embedding, again.context, query="  flutter   APPS ") == "We build Flutter apps."
+    assert cache.stats()["hits"] == 1
+
+
+def test_exact_tier_still_requires_the_same_context():
+    cache = SemanticResponseCache()
+    cache.store(None, "context a", "answer", query="pricing")
+    assert cache.lookup(None, "context b", query="pricing") is None
+    assert cache.lookup(None, "context a", query="pricing") == "answer"
+
+
+def test_semantic_lookup_matches_similar_embeddings():
+    cache = SemanticResponseCache(threshold=0.9)
+    cache.store([1.0, 0.0], "context", "answer", query="what do you build")
+    assert cache.lookup([0.99, 0.05], "context", query="what do you make") == "answer"
+    assert cache.lookup([0.0, 1.0], "context", query="something else") is None